@@ -0,0 +1,53 @@
+# Leaf evaluation throughput: one evaluate_complex call per position versus one evaluate_batch call for all of them
+# run from the repository root: python -m benchmarks.batch_eval_bench [--positions N]
+
+import argparse
+import random
+import time
+
+from chess import ChessAI, ChessEngine
+
+
+# positions sampled from random games: (board, bitboards) pairs
+def random_positions(count, seed=1):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        gs = ChessEngine.GameState()
+        for _ in range(rng.randint(10, 120)):
+            moves = gs.get_valid_moves()
+            if len(moves) == 0:
+                break
+            gs.make_move(rng.choice(moves))
+            positions.append((gs.board, gs.bitboards[:]))
+    return positions[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-position vs batched leaf evaluation")
+    parser.add_argument("--positions", type=int, default=20000)
+    args = parser.parse_args()
+
+    ai = ChessAI.AI()
+    positions = random_positions(args.positions)
+    gs = ChessEngine.GameState() # only consulted for its check_mate/stale_mate flags, which are both False
+
+    start = time.perf_counter()
+    one_by_one = [ai.evaluate_complex(gs, board) for board, _ in positions]
+    single_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    planes = ChessAI.bitboards_to_planes([bitboards for _, bitboards in positions])
+    batched = ai.evaluate_batch(planes)
+    batch_seconds = time.perf_counter() - start
+
+    if list(batched) != one_by_one:
+        raise SystemExit("batched scores differ from evaluate_complex")
+    print(f"evaluate_complex: {len(positions)} positions in {single_seconds:.3f}s "
+          f"({len(positions) / single_seconds:,.0f} positions/s)")
+    print(f"evaluate_batch:   {len(positions)} positions in {batch_seconds:.3f}s "
+          f"({len(positions) / batch_seconds:,.0f} positions/s), {single_seconds / batch_seconds:.0f}x faster")
+
+
+if __name__ == "__main__":
+    main()
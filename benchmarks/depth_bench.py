@@ -0,0 +1,41 @@
+# Depth reached within a time budget on the bench positions, by the search with and without its selective parts
+# (null move pruning, late move reductions, check extensions), each switched off alone with --ablation
+# depths are counted in plies including the root move, the way UCI reports them
+# run from the repository root: python -m benchmarks.depth_bench [--time SECONDS] [--max-depth N] [--ablation]
+
+import argparse
+import time
+
+from chess import ChessAI, ChessEngine
+from benchmarks.perft_bench import load_bitboard_engine
+from benchmarks.search_bench import POSITIONS
+
+FULL = {"null_move": True, "late_move_reductions": True, "check_extensions": True}
+PLAIN = {"null_move": False, "late_move_reductions": False, "check_extensions": False}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="depth reached per position within a time budget")
+    parser.add_argument("--time", type=float, default=5, help="seconds per position (ChessMain gives the AI 5)")
+    parser.add_argument("--max-depth", type=int, default=20, help="plies including the root move")
+    parser.add_argument("--ablation", action="store_true", help="also run the full search without each of its parts")
+    args = parser.parse_args()
+
+    configurations = [("alpha-beta", PLAIN), ("full", FULL)]
+    if args.ablation:
+        configurations += [(f"no {name.replace('_', ' ')}", dict(FULL, **{name: False})) for name in FULL]
+    for label, options in configurations:
+        depths = []
+        for name, fen in POSITIONS:
+            ai = ChessAI.AI(**options)
+            start = time.perf_counter()
+            move = ai.generate_smart_move(load_bitboard_engine(fen), args.max_depth - 1, 2, args.time)
+            seconds = time.perf_counter() - start
+            depths.append(ai.completed_depth + 1)
+            print(f"{label:>22} {name:>12}: depth {ai.completed_depth + 1}, {ChessEngine.Move(move).get_chess_notation()} "
+                  f"score {ai.best_score}, {ai.nodes} nodes in {seconds:.2f}s")
+        print(f"{label:>22} {'mean depth':>12}: {sum(depths) / len(depths):.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# Memory and garbage collector cost of packed int moves against one object per move (the Move class as it was
+# before moves were packed, copied below)
+# the gc figures are measured, not estimated: collections each run triggered and the time spent in them
+# run from the repository root: python -m benchmarks.move_alloc_bench [--depth N]
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from chess import ChessEngine
+from chess.perft import REFERENCE_POSITIONS, load
+
+
+# the old Move: a regular object with its own __dict__, built from the board for every generated move
+class ObjectMove():
+
+    def __init__(self, start_square, end_square, board):
+        self.start_row = start_square[0]
+        self.start_col = start_square[1]
+        self.end_row = end_square[0]
+        self.end_col = end_square[1]
+        self.piece_moved = board[self.start_row][self.start_col]
+        self.piece_captured = board[self.end_row][self.end_col]
+        self.is_pawn_promotion = False
+        if (self.piece_moved == 'wp' and self.end_row == 0) or (self.piece_moved == 'bp' and self.end_row == 7):
+            self.is_pawn_promotion = True
+        self.move_id = self.start_row * 1000 + self.start_col * 100 + self.end_row * 10 + self.end_col
+
+
+# the same legal moves as objects, made the way the generator used to make them
+def as_objects(gs, moves):
+    board = gs.board
+    return [ObjectMove((move >> 3 & 7, move & 7), (move >> 9 & 7, move >> 6 & 7), board) for move in moves]
+
+
+# perft that keeps every node's move list alive until its children are done, like the search does
+# returns (leaf nodes, generated moves)
+def perft(gs, depth, objects):
+    if depth == 0:
+        return 1, 0
+    moves = gs.get_valid_moves()
+    object_moves = as_objects(gs, moves) if objects else None # held while the children are searched
+    nodes = 0
+    generated = len(moves)
+    for move in moves:
+        gs.make_move(move)
+        child_nodes, child_generated = perft(gs, depth - 1, objects)
+        nodes += child_nodes
+        generated += child_generated
+        gs.undo_move()
+    return nodes, generated
+
+
+# (seconds, generated moves, peak bytes traced, collections per gc generation, seconds spent collecting) for a perft
+# of every reference position; the collections are the difference of gc.get_stats() around the run and their time is
+# measured with a gc callback, so both count what the run really triggered
+def run(depth, objects, trace):
+    collection_seconds = [0.0]
+    collection_start = [0.0]
+
+    def time_collection(phase, info):
+        if phase == "start":
+            collection_start[0] = time.perf_counter()
+        else:
+            collection_seconds[0] += time.perf_counter() - collection_start[0]
+
+    gc.collect() # start from an empty youngest generation, so earlier garbage isn't counted
+    if trace:
+        tracemalloc.start()
+    stats_before = gc.get_stats()
+    gc.callbacks.append(time_collection)
+    generated = 0
+    start = time.perf_counter()
+    try:
+        for _, fen, _ in REFERENCE_POSITIONS:
+            generated += perft(load(fen), depth, objects)[1]
+    finally:
+        gc.callbacks.remove(time_collection)
+    seconds = time.perf_counter() - start
+    collections = [after["collections"] - before["collections"] for before, after in zip(stats_before, gc.get_stats())]
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, generated, peak, collections, collection_seconds[0]
+
+
+# bytes allocated to hold the legal moves of every reference position
+def move_list_bytes(objects):
+    positions = [load(fen) for _, fen, _ in REFERENCE_POSITIONS]
+    tracemalloc.start()
+    lists = []
+    for gs in positions:
+        moves = gs.get_valid_moves()
+        lists.append(as_objects(gs, moves) if objects else moves)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size, sum(len(moves) for moves in lists)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="packed int moves vs move objects: memory and gc")
+    parser.add_argument("--depth", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"packed move: {sys.getsizeof(1 << 20)} bytes, Move wrapper: {sys.getsizeof(ChessEngine.Move(1 << 20))} bytes, "
+          f"object move: {sys.getsizeof(ObjectMove((6, 4), (4, 4), ChessEngine.INITIAL_BOARD))} bytes + its __dict__")
+    for label, objects in (("packed ints", False), ("move objects", True)):
+        size, count = move_list_bytes(objects)
+        print(f"{label:>12}: {size / count:.0f} bytes per generated move ({count} moves)")
+    for label, objects in (("packed ints", False), ("move objects", True)):
+        seconds, generated, _, collections, collection_seconds = run(args.depth, objects, False)
+        peak = run(args.depth, objects, True)[2]
+        print(f"{label:>12}: perft({args.depth}) of every reference position in {seconds:.2f}s, {generated} moves generated, "
+              f"gc collections {'/'.join(map(str, collections))} (generation 0/1/2) taking {collection_seconds * 1000:.0f} ms, "
+              f"peak memory {peak / 1024:.0f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+# Hit rates of the legal move cache at several sizes, with the search positions searched one after the other through
+# one shared cache (the way the GUI's cache sees the AI's searches)
+# run from the repository root: python -m benchmarks.move_cache_bench [--depth N] [--sizes N [N ...]]
+
+import argparse
+import time
+
+from chess import ChessAI, ChessEngine
+from benchmarks.perft_bench import load_bitboard_engine
+from benchmarks.search_bench import POSITIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="legal move cache hit rates and search time")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000], help="cache sizes in entries")
+    args = parser.parse_args()
+
+    for size in [0] + args.sizes:
+        cache = ChessEngine.MoveCache(size) if size else None
+        seconds = 0.0
+        for _, fen in POSITIONS:
+            gs = load_bitboard_engine(fen)
+            gs.move_cache = cache
+            start = time.perf_counter()
+            ChessAI.AI().generate_smart_move(gs, args.depth, 2)
+            seconds += time.perf_counter() - start
+        if cache is None:
+            print(f"no cache: {seconds:.2f}s")
+            continue
+        stats = cache.get_stats()
+        print(f"{size} entries: {seconds:.2f}s, {stats['hits']} hits, {stats['misses']} misses, "
+              f"hit rate {stats['hit_rate']:.1%}, {stats['evictions']} evictions")
+
+
+if __name__ == "__main__":
+    main()
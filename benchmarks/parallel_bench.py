@@ -0,0 +1,96 @@
+# Scaling of the parallel search: time to a fixed depth with 1, 2, 4... workers in both modes, against the serial search
+# run from the repository root: python -m benchmarks.parallel_bench [--depth N] [--workers N [N ...]]
+# the root split has to find the move and score of the serial search with the same options
+# (ParallelSearch.ROOT_SPLIT_OPTIONS) on every position: the bench positions, which are timed, and PARITY_POSITIONS
+# random positions more, which are only checked; lazy smp agreement is only reported, since what the helpers leave in
+# the shared table can change the main worker's result
+
+import argparse
+import multiprocessing
+import random
+import time
+
+from chess import ChessAI, ChessEngine
+from chess.parallel import ParallelSearch
+from benchmarks.perft_bench import load_bitboard_engine
+from benchmarks.search_bench import POSITIONS
+
+PARITY_POSITIONS = 16
+
+
+# positions after a few random moves from the start, as (name, GameState)
+def random_positions(count, seed=1):
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        gs = ChessEngine.GameState()
+        for _ in range(rng.randint(4, 30)):
+            moves = gs.get_valid_moves()
+            if not moves:
+                break
+            gs.make_move(rng.choice(moves))
+        if gs.get_valid_moves():
+            positions.append((f"random {len(positions) + 1}", ChessEngine.GameState(fen=gs.get_fen())))
+    return positions
+
+
+# (move in chess notation, score) of a search's result
+def result_of(search, move):
+    return ChessEngine.Move(move).get_chess_notation(), search.best_score
+
+
+# fails the run unless the root split finds the move and score of the serial search with its options on every
+# one of positions
+def check_root_split_parity(positions, depth, workers):
+    with ParallelSearch(workers, "root") as search:
+        for name, gs in positions:
+            ai = ChessAI.AI(**ParallelSearch.ROOT_SPLIT_OPTIONS)
+            expected = result_of(ai, ai.generate_smart_move(gs.copy(), depth, 2))
+            result = result_of(search, search.generate_smart_move(gs.copy(), depth, 2))
+            if result != expected:
+                raise SystemExit(f"root split found {result} on {name} ({gs.get_fen()}), the serial search {expected}")
+    print(f"root split: same move and score as the serial search on {len(positions)} random positions")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parallel search speedup and efficiency")
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, multiprocessing.cpu_count()])
+    args = parser.parse_args()
+    worker_counts = sorted(set(args.workers))
+    print(f"{multiprocessing.cpu_count()} cores")
+
+    serial = {}
+    serial_seconds = 0.0
+    for name, fen in POSITIONS:
+        ai = ChessAI.AI(**ParallelSearch.ROOT_SPLIT_OPTIONS)
+        start = time.perf_counter()
+        move = ai.generate_smart_move(load_bitboard_engine(fen), args.depth, 2)
+        serial_seconds += time.perf_counter() - start
+        serial[name] = result_of(ai, move)
+        print(f"{'serial':>8} {name:>12}: {serial[name][0]} score {ai.best_score}, {ai.nodes} nodes")
+    print(f"{'serial':>8}: {serial_seconds:.2f}s")
+
+    for mode in ParallelSearch.MODES:
+        for workers in worker_counts:
+            agree = 0
+            nodes = 0
+            seconds = 0.0
+            with ParallelSearch(workers, mode) as search:
+                for name, fen in POSITIONS:
+                    start = time.perf_counter()
+                    move = search.generate_smart_move(load_bitboard_engine(fen), args.depth, 2)
+                    seconds += time.perf_counter() - start
+                    nodes += search.nodes
+                    result = result_of(search, move)
+                    agree += result == serial[name]
+                    if mode == "root" and result != serial[name]:
+                        raise SystemExit(f"root split found {result} on {name}, the serial search {serial[name]}")
+            speedup = serial_seconds / seconds
+            print(f"{mode:>8} {workers:>2} workers: {seconds:.2f}s, {nodes} nodes, speedup {speedup:.2f}x, "
+                  f"efficiency {speedup / workers:.0%}, {agree}/{len(POSITIONS)} same as serial")
+    check_root_split_parity(random_positions(PARITY_POSITIONS), args.depth, max(worker_counts))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# Perft throughput of the bitboard GameState against the original string-array one
+# run from the repository root: python -m benchmarks.perft_bench [--depth N]
+# every position is searched by both engines and the node counts have to agree
+
+import argparse
+import time
+
+import numpy as np
+
+from chess import ChessEngine
+from benchmarks import legacy_engine
+
+# (name, piece placement and side to move in FEN notation, perft depth)
+POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w", 3),
+    ("pins and checks", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w", 3),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w", 2),
+    ("promotions", "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b", 3),
+    ("discovered checks", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w", 2),
+]
+
+
+# turns a FEN piece placement into the 2d array of piece strings both engines use
+def placement_to_board(placement):
+    board = []
+    for fen_row in placement.split("/"):
+        row = []
+        for char in fen_row:
+            if char.isdigit():
+                row.extend(["**"] * int(char))
+            else:
+                row.append(("w" if char.isupper() else "b") + (char.lower() if char in "pP" else char.upper()))
+        board.append(row)
+    return board
+
+
+def load_bitboard_engine(fen):
+    placement, side = fen.split()
+    gs = ChessEngine.GameState()
+    gs.set_board(placement_to_board(placement), side == "w")
+    return gs
+
+
+def load_legacy_engine(fen):
+    placement, side = fen.split()
+    gs = legacy_engine.GameState()
+    gs.board = np.array(placement_to_board(placement))
+    gs.white_to_move = side == "w"
+    for r in range(8):
+        for c in range(8):
+            if gs.board[r][c] == "wK":
+                gs.white_king_location = (r, c)
+            elif gs.board[r][c] == "bK":
+                gs.black_king_location = (r, c)
+    return gs
+
+
+# counts the leaf nodes of the legal move tree (works with any GameState exposing get_valid_moves/make_move/undo_move)
+def perft(gs, depth):
+    if depth == 0:
+        return 1
+    nodes = 0
+    for move in gs.get_valid_moves():
+        gs.make_move(move)
+        nodes += perft(gs, depth - 1)
+        gs.undo_move()
+    return nodes
+
+
+# returns (nodes, seconds) for a perft of the given depth
+def time_perft(gs, depth):
+    start = time.perf_counter()
+    nodes = perft(gs, depth)
+    return nodes, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="perft throughput: bitboards vs string array")
+    parser.add_argument("--depth", type=int, help="overrides the depth of every position")
+    args = parser.parse_args()
+
+    totals = {"string array": [0, 0.0], "bitboards": [0, 0.0]}
+    for name, fen, depth in POSITIONS:
+        depth = args.depth or depth
+        counts = []
+        for engine, load in (("string array", load_legacy_engine), ("bitboards", load_bitboard_engine)):
+            nodes, seconds = time_perft(load(fen), depth)
+            counts.append(nodes)
+            totals[engine][0] += nodes
+            totals[engine][1] += seconds
+            print(f"{name:>18} {engine:>12}: perft({depth}) = {nodes} nodes in {seconds:.2f}s ({nodes / seconds:,.0f} nodes/s)")
+        if counts[0] != counts[1]:
+            raise SystemExit(f"node counts differ between the two engines on {name}")
+
+    for engine, (nodes, seconds) in totals.items():
+        print(f"{'total':>18} {engine:>12}: {nodes} nodes in {seconds:.2f}s ({nodes / seconds:,.0f} nodes/s)")
+    print(f"speedup: {totals['string array'][1] / totals['bitboards'][1]:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
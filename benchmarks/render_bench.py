@@ -0,0 +1,116 @@
+# Frame times of the GUI's drawing: the old full redraw (every square, every piece, a new highlight surface and font
+# each frame, then display.flip) against ChessMain.BoardRenderer, which repaints only the squares that changed and
+# sends just those to the display
+# the frames replay a short game: idle frames while nobody moves, frames with a piece selected, move frames, then the
+# end game text shown and taken away again
+# before timing, every frame is drawn both ways on two surfaces and the pixels compared, the bench stops on a mismatch
+# runs on SDL's dummy video driver unless SDL_VIDEODRIVER says otherwise, so no window opens
+# run from the repository root: python -m benchmarks.render_bench [--rounds N]
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame as p
+
+from chess import ChessEngine, ChessMain
+from chess.ChessMain import DIMENSION, SQUARE_SIZE
+
+# moves of the replayed game, as (start, end) squares
+GAME = [((6, 4), (4, 4)), ((1, 4), (3, 4)), ((7, 6), (5, 5)), ((0, 1), (2, 2)), ((7, 5), (3, 1)), ((1, 0), (2, 0))]
+IDLE_FRAMES = 10 # frames without any change after each step, the usual case at 15 FPS
+END_TEXT = "Black wins by checkmate"
+
+
+# the drawing code as it was before BoardRenderer, for comparison
+def legacy_draw(screen, game_state, square_selected, text=None):
+    colors = [p.Color("white"), p.Color("lavender")]
+    for row in range(DIMENSION):
+        for column in range(DIMENSION):
+            p.draw.rect(screen, colors[(row + column) % 2], p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    if square_selected != ():
+        r, c = square_selected
+        if game_state.board[r][c][0] == ('w' if game_state.white_to_move else 'b'):
+            s = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
+            s.set_alpha(100)
+            s.fill(p.Color('gray'))
+            screen.blit(s, (c*SQUARE_SIZE, r*SQUARE_SIZE))
+            s.fill(p.Color('yellow'))
+            for move in map(ChessEngine.Move, game_state.move_cache.moves_from(game_state, r, c)):
+                if game_state.board[move.end_row][move.end_col][0] == ('b' if game_state.white_to_move else 'w'):
+                    screen.blit(s, (move.end_col * SQUARE_SIZE, move.end_row * SQUARE_SIZE))
+                else:
+                    p.draw.circle(screen, 'yellow', ((move.end_col * SQUARE_SIZE + 33), (move.end_row * SQUARE_SIZE + 33)), 10)
+    for row in range(DIMENSION):
+        for column in range(DIMENSION):
+            piece = game_state.board[row][column]
+            if piece != "**":
+                screen.blit(ChessMain.IMAGES[piece], p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    if text is not None:
+        font = p.font.SysFont("consolas", 35, True, False)
+        ChessMain.draw_text(screen, font.render(text, True, p.Color('Dark Green')))
+    p.display.flip()
+
+
+def incremental_draw(renderer, game_state, square_selected, text=None):
+    dirty = renderer.draw(game_state, square_selected, text)
+    if dirty:
+        p.display.update(dirty)
+
+
+# (game state, selected square, end game text) of every frame of the replayed game
+def frames(idle_frames):
+    game_state = ChessEngine.GameState(move_cache=ChessEngine.MoveCache(1000))
+    for start, end in GAME:
+        for selected in ((), start, start):
+            for _ in range(idle_frames if selected == () else 1):
+                yield game_state, selected, None
+        game_state.make_move(game_state.move_cache.find_move(game_state, start, end))
+    for text in (None, END_TEXT, None):
+        for _ in range(idle_frames):
+            yield game_state, (), text
+
+
+# draws every frame with both the full redraw and BoardRenderer, each on its own surface, and stops if any frame's
+# pixels differ
+def check_identical(screen):
+    full = p.Surface(screen.get_size()).convert()
+    incremental = full.copy()
+    renderer = ChessMain.BoardRenderer(incremental)
+    for number, (game_state, selected, text) in enumerate(frames(2)):
+        legacy_draw(full, game_state, selected, text)
+        renderer.draw(game_state, selected, text)
+        if p.image.tostring(full, "RGB") != p.image.tostring(incremental, "RGB"):
+            raise SystemExit(f"frame {number}: the incremental drawing differs from the full redraw")
+    print(f"{number + 1} frames drawn both ways, pixels identical")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="frame times of the full and the incremental board drawing")
+    parser.add_argument("--rounds", type=int, default=20, help="times the game is replayed")
+    args = parser.parse_args()
+
+    p.init()
+    screen = p.display.set_mode((ChessMain.WIDTH, ChessMain.HEIGHT))
+    ChessMain.load_images()
+    check_identical(screen)
+    renderer = ChessMain.BoardRenderer(screen)
+    for name, draw in (("full redraw", lambda gs, selected, text: legacy_draw(screen, gs, selected, text)),
+                       ("incremental", lambda gs, selected, text: incremental_draw(renderer, gs, selected, text))):
+        times = []
+        for _ in range(args.rounds):
+            renderer.invalidate()
+            for game_state, selected, text in frames(IDLE_FRAMES):
+                start = time.perf_counter()
+                draw(game_state, selected, text)
+                times.append(time.perf_counter() - start)
+        times.sort()
+        print(f"{name:>12}: {len(times)} frames, mean {sum(times) / len(times) * 1000:.3f} ms, "
+              f"p50 {times[len(times) // 2] * 1000:.3f} ms, max {times[-1] * 1000:.3f} ms")
+    p.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+# Search statistics on a fixed set of positions: best move, score, nodes, time and move ordering quality
+# run from the repository root: python -m benchmarks.search_bench [--depth N] [--time SECONDS] [--no-quiescence] [--stats]
+# --stats attaches a ChessAI.SearchStats and prints its profile of every search (nodes per ply, cutoffs, timings)
+
+import argparse
+import time
+
+from chess import ChessAI, ChessEngine
+from benchmarks.perft_bench import load_bitboard_engine
+
+# (name, piece placement and side to move in FEN notation)
+POSITIONS = [
+    ("after 1.e4", "rnbqkbnr/pppppppp/8/8/4P3/8/PPPP1PPP/RNBQKBNR b"),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 b"),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 b"),
+    ("knight fork", "6k1/5ppp/8/8/3n4/8/5PPP/2Q3K1 b"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search statistics on the bench positions")
+    # generate_smart_move's depth does not count the root move, so depth 3 is a 4 ply search
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--time", type=float, help="time limit per position in seconds")
+    parser.add_argument("--no-quiescence", action="store_true", help="evaluate the horizon without quiescence search")
+    parser.add_argument("--stats", action="store_true", help="profile every search with SearchStats")
+    args = parser.parse_args()
+
+    total_nodes = 0
+    total_seconds = 0.0
+    for name, fen in POSITIONS:
+        ai = ChessAI.AI(quiescence=not args.no_quiescence, stats=ChessAI.SearchStats() if args.stats else None)
+        start = time.perf_counter()
+        move = ai.generate_smart_move(load_bitboard_engine(fen), args.depth, 2, args.time)
+        seconds = time.perf_counter() - start
+        total_nodes += ai.nodes
+        total_seconds += seconds
+        print(f"{name:>12}: {ChessEngine.Move(move).get_chess_notation()} score {ai.best_score} depth {ai.completed_depth}, {ai.nodes} nodes "
+              f"in {seconds:.2f}s, first move cutoffs {ai.ordering.first_move_cutoff_rate():.1%} "
+              f"of {ai.ordering.cutoffs}")
+        if ai.stats is not None:
+            print("              " + ai.stats.format().replace("\n", "\n              "))
+    print(f"{'total':>12}: {total_nodes} nodes in {total_seconds:.2f}s ({total_nodes / total_seconds:,.0f} nodes/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Launch cost of the engine: how long build_attack_tables takes, how long a fresh interpreter needs to import the
+# headless modules (engine, AI, UCI front end) and the GUI, how long the GUI takes to get its window and images ready,
+# and how long a headless UCI engine process takes to answer readyok
+# also lists the heavy modules (numpy, pygame) each headless entry point pulls in, which should be none
+# the GUI is timed on SDL's dummy video driver, so no window opens
+# run from the repository root: python -m benchmarks.startup_bench [--runs N]
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from chess import ChessEngine
+
+IMPORT_TIME = "import time; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+# from a new interpreter to the GUI's first frame: pygame initialized, window open, images loaded, board drawn
+GUI_READY = ("import time; start = time.perf_counter(); import pygame as p; from chess import ChessMain, ChessEngine; "
+             "p.init(); screen = p.display.set_mode((ChessMain.WIDTH, ChessMain.HEIGHT)); ChessMain.load_images(); "
+             "ChessMain.BoardRenderer(screen).draw(ChessEngine.GameState(), ()); p.display.flip(); "
+             "print(time.perf_counter() - start)")
+HEADLESS_MODULES = ("chess.ChessEngine", "chess.ChessAI", "chess.uci", "chess.epd", "chess.selfplay")
+HEAVY_IMPORTS = "import sys, {module}; print(' '.join(sorted(name for name in ('pygame', 'numpy') if name in sys.modules)))"
+
+
+def time_build(runs):
+    start = time.perf_counter()
+    for _ in range(runs):
+        ChessEngine.build_attack_tables()
+    return (time.perf_counter() - start) / runs
+
+
+# best of several fresh interpreters running code (which prints its own timing), so the numbers don't depend on the
+# disk cache warming up
+def time_fresh(code, runs):
+    env = dict(os.environ, SDL_VIDEODRIVER=os.environ.get("SDL_VIDEODRIVER", "dummy"), PYGAME_HIDE_SUPPORT_PROMPT="1")
+    return min(float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                    env=env).stdout) for _ in range(runs))
+
+
+def time_import(module, runs):
+    return time_fresh(IMPORT_TIME.format(module=module), runs)
+
+
+# best of several launches of python -m chess.uci: time from starting the process to its readyok
+def time_uci(runs):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        engine = subprocess.Popen([sys.executable, "-m", "chess.uci"], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                  text=True)
+        engine.stdin.write("uci\nisready\n")
+        engine.stdin.flush()
+        while engine.stdout.readline().strip() != "readyok":
+            pass
+        seconds = time.perf_counter() - start
+        engine.communicate("quit\n")
+        best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="attack table build time, import times and uci/GUI startup time")
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    print(f"build_attack_tables: {time_build(args.runs) * 1000:.1f} ms")
+    print("headless, in a new interpreter:")
+    for module in HEADLESS_MODULES:
+        heavy = subprocess.run([sys.executable, "-c", HEAVY_IMPORTS.format(module=module)], capture_output=True,
+                               text=True, check=True).stdout.strip()
+        print(f"  import {module}: {time_import(module, args.runs) * 1000:.1f} ms, heavy modules: {heavy or 'none'}")
+    print(f"  python -m chess.uci up to readyok: {time_uci(args.runs) * 1000:.1f} ms")
+    print("GUI, in a new interpreter:")
+    print(f"  import chess.ChessMain: {time_import('chess.ChessMain', args.runs) * 1000:.1f} ms")
+    print(f"  up to the first frame: {time_fresh(GUI_READY, args.runs) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
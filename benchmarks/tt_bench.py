@@ -0,0 +1,37 @@
+# Nodes saved by the transposition table: searches each position without a table and with tables of several sizes
+# run from the repository root: python -m benchmarks.tt_bench [--depth N] [--sizes MB [MB ...]]
+
+import argparse
+import time
+
+from chess import ChessAI, ChessEngine
+from benchmarks.perft_bench import load_bitboard_engine
+from benchmarks.search_bench import POSITIONS
+
+
+def main():
+    parser = argparse.ArgumentParser(description="transposition table hit rates and node savings")
+    # generate_smart_move's depth does not count the root move, so depth 3 is a 4 ply search
+    parser.add_argument("--depth", type=int, default=3)
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 16], help="table sizes in MB")
+    args = parser.parse_args()
+
+    for name, fen in POSITIONS:
+        baseline = None
+        for size_mb in [0] + args.sizes:
+            ai = ChessAI.AI(tt_size_mb=size_mb)
+            start = time.perf_counter()
+            move = ai.generate_smart_move(load_bitboard_engine(fen), args.depth, 2)
+            seconds = time.perf_counter() - start
+            if baseline is None:
+                baseline = ai.nodes
+                print(f"{name}: {ChessEngine.Move(move).get_chess_notation()} no table: {ai.nodes} nodes in {seconds:.2f}s")
+                continue
+            stats = ai.tt.get_stats()
+            print(f"{name}: {ChessEngine.Move(move).get_chess_notation()} {stats['size_mb']:g} MB: {ai.nodes} nodes in {seconds:.2f}s "
+                  f"({1 - ai.nodes / baseline:.0%} saved), {stats['probes']} probes, hit rate {stats['hit_rate']:.1%}, "
+                  f"{stats['collisions']} collisions, {stats['overwrites']} overwrites")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,77 +1,537 @@
+import json
 import random
-import numpy as np
+import threading
+import time
+from array import array
 
-class AI():
+from chess import ChessEngine
+from chess.ChessEngine import MOVE_SQUARES, PROMOTION
+
+# score of a checkmate; every other evaluation lies strictly between -CHECKMATE and CHECKMATE
+CHECKMATE = 100000
+# the search scores a mate n plies from the root CHECKMATE - n (negative for the side getting mated), so the quickest
+# mate is preferred: scores beyond MATE_SCORE_BOUND either way are such mates
+MATE_SCORE_BOUND = CHECKMATE - 1000
+# quiescence search stops this many plies below the horizon even if captures remain
+QUIESCENCE_MAX_PLY = 8
+# captures are skipped in quiescence search when winning the victim plus this margin still can't reach alpha
+DELTA_MARGIN = 200
+# half-width of the window iterative deepening searches around the previous iteration's score
+ASPIRATION_WINDOW = 50
+# null move pruning: the null move is searched this many plies shallower than a real move (one more from depth 7 on),
+# and only at nodes at least NULL_MOVE_MIN_DEPTH deep
+NULL_MOVE_REDUCTION = 2
+NULL_MOVE_MIN_DEPTH = 3
+# late move reductions: quiet moves after the first LMR_FULL_DEPTH_MOVES of a node at least LMR_MIN_DEPTH deep are
+# searched a ply shallower (two plies after the first LMR_DEEP_MOVES), and again at full depth if they beat alpha
+LMR_FULL_DEPTH_MOVES = 3
+LMR_DEEP_MOVES = 6
+LMR_MIN_DEPTH = 3
+
+# bound types of transposition table scores: the exact minimax value, or only a lower/upper limit on it because the
+# search was cut off by the alpha-beta window
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+# piece position scores in centipawns, written from white's side (row 0 is the first rank); plain tuples, so importing
+# the AI costs nothing to build them
+PAWN_TABLE = (
+    ( 0,  0,  0,  0,  0,  0,  0,  0),
+    ( 5, 10, 10,-20,-20, 10, 10,  5),
+    ( 5, -5,-10,  0,  0,-10, -5,  5),
+    ( 0,  0,  0, 20, 20,  0,  0,  0),
+    ( 5,  5, 10, 25, 25, 10,  5,  5),
+    (10, 10, 20, 30, 30, 20, 10, 10),
+    (50, 50, 50, 50, 50, 50, 50, 50),
+    ( 0,  0,  0,  0,  0,  0,  0,  0),
+)
+
+KNIGHT_TABLE = (
+    (-50, -40, -30, -30, -30, -30, -40, -50),
+    (-40, -20,   0,   5,   5,   0, -20, -40),
+    (-30,   5,  10,  15,  15,  10,   5, -30),
+    (-30,   0,  15,  20,  20,  15,   0, -30),
+    (-30,   5,  15,  20,  20,  15,   0, -30),
+    (-30,   0,  10,  15,  15,  10,   0, -30),
+    (-40, -20,   0,   0,   0,   0, -20, -40),
+    (-50, -40, -30, -30, -30, -30, -40, -50),
+)
+
+BISHOP_TABLE = (
+    (-20, -10, -10, -10, -10, -10, -10, -20),
+    (-10,   5,   0,   0,   0,   0,   5, -10),
+    (-10,  10,  10,  10,  10,  10,  10, -10),
+    (-10,   0,  10,  10,  10,  10,   0, -10),
+    (-10,   5,   5,  10,  10,   5,   5, -10),
+    (-10,   0,   5,  10,  10,   5,   0, -10),
+    (-10,   0,   0,   0,   0,   0,   0, -10),
+    (-20, -10, -10, -10, -10, -10, -10, -20),
+)
+
+ROOK_TABLE = (
+    ( 0,  0,  0,  5,  5,  0,  0,  0),
+    (-5,  0,  0,  0,  0,  0,  0, -5),
+    (-5,  0,  0,  0,  0,  0,  0, -5),
+    (-5,  0,  0,  0,  0,  0,  0, -5),
+    (-5,  0,  0,  0,  0,  0,  0, -5),
+    (-5,  0,  0,  0,  0,  0,  0, -5),
+    ( 5, 10, 10, 10, 10, 10, 10,  5),
+    ( 0,  0,  0,  0,  0,  0,  0,  0),
+)
+
+QUEEN_TABLE = (
+    (-20, -10, -10, -5, -5, -10, -10, -20),
+    (-10,   0,   5,  0,  0,   0,   0, -10),
+    (-10,   5,   5,  5,  5,   5,   0, -10),
+    (  0,   0,   5,  5,  5,   5,   0,  -5),
+    ( -5,   0,   5,  5,  5,   5,   0,  -5),
+    (-10,   0,   5,  5,  5,   5,   0, -10),
+    (-10,   0,   0,  0,  0,   0,   0, -10),
+    (-20, -10, -10, -5, -5, -10, -10, -20),
+)
+
+KING_TABLE = (
+    ( 20,  30,  10,   0,   0,  10,  30,  20),
+    ( 20,  20,   0,   0,   0,   0,  20,  20),
+    (-10, -20, -20, -20, -20, -20, -20, -10),
+    (-20, -30, -30, -40, -40, -30, -30, -20),
+    (-30, -40, -40, -50, -50, -40, -40, -30),
+    (-30, -40, -40, -50, -50, -40, -40, -30),
+    (-30, -40, -40, -50, -50, -40, -40, -30),
+    (-30, -40, -40, -50, -50, -40, -40, -30),
+)
+
+
+# raised inside the search when the time/node budget runs out or AI.stop() is called; generate_smart_move catches it
+class SearchStopped(Exception):
+    pass
+
+
+# numpy is only needed for the batch evaluation below, so it is imported on first use: the processes that only search
+# (uci, self-play and EPD workers) start without it
+def load_numpy():
+    import numpy
+    return numpy
+
+
+# piece planes of a board (2d array of piece strings): a (12, 8, 8) array where planes[i][r][c] is 1 when
+# ChessEngine.PIECES[i] stands on (r, c)
+def board_to_planes(board):
+    np = load_numpy()
+    planes = np.zeros((len(ChessEngine.PIECES), 8, 8), dtype=np.uint8)
+    for r in range(8):
+        for c in range(8):
+            if board[r][c] != "**":
+                planes[ChessEngine.PIECE_INDEX[board[r][c]], r, c] = 1
+    return planes
+
+
+# piece planes of many positions at once, (N, 12, 8, 8), unpacked straight from their GameState.bitboards lists
+# (bit row * 8 + col of a bitboard is byte row, bit col of its little-endian bytes)
+def bitboards_to_planes(bitboards_list):
+    np = load_numpy()
+    packed = np.array(bitboards_list, dtype='<u8').reshape(-1, len(ChessEngine.PIECES))
+    bytes_per_row = packed.view(np.uint8).reshape(-1, len(ChessEngine.PIECES), 8)
+    return np.unpackbits(bytes_per_row, axis=-1, bitorder='little')
+
+
+# long algebraic notation of a packed move, as UCI writes it: e2e4, e7e8q
+def move_notation(move):
+    return ChessEngine.Move(move).get_chess_notation() + ("q" if move & PROMOTION else "")
+
+
+# fixed-size hash table of searched positions keyed by zobrist key
+# each slot is two 8-byte words (the key and a packed entry) in flat arrays, so the table uses exactly its memory budget
+# and nothing is allocated while searching
+# the key word holds key ^ entry: a slot half-written by another process sharing the table fails the key test instead
+# of returning a mixed-up entry, so shared tables need no locks
+class TranspositionTable():
+
+    SLOT_BYTES = 16
+    # a bucket is a depth-preferred slot, replaced only by deeper searches or entries from a newer search, followed by
+    # an always-replace slot that takes whatever the first one refuses
+    BUCKET_SLOTS = 2
+    SCORE_OFFSET = 1 << 23
+
+    # shared=True allocates the table in shared memory; worker processes started with shared_buffers as an argument
+    # can then open the same table with TranspositionTable.from_shared
+    def __init__(self, size_mb=16, shared=False):
+        buckets = max(1, int(size_mb * 1024 * 1024) // (self.SLOT_BYTES * self.BUCKET_SLOTS))
+        buckets = 1 << (buckets.bit_length() - 1) # power of two so the bucket index is just the low bits of the key
+        slots = buckets * self.BUCKET_SLOTS
+        if shared:
+            import multiprocessing # only parallel searches share tables, the others start without it
+            self.shared_buffers = (multiprocessing.RawArray('Q', slots), multiprocessing.RawArray('Q', slots))
+            self.use_buffers(*self.shared_buffers)
+        else:
+            self.shared_buffers = None
+            self.use_buffers(array('Q', bytes(8 * slots)), array('Q', bytes(8 * slots)))
+
+    # table over the shared buffers of another process's TranspositionTable(shared=True)
+    @classmethod
+    def from_shared(cls, shared_buffers):
+        table = cls.__new__(cls)
+        table.shared_buffers = shared_buffers
+        table.use_buffers(*shared_buffers)
+        return table
+
+    def use_buffers(self, keys, entries):
+        # shared ctypes arrays are indexed through memoryviews, which is as fast as indexing an array
+        self.keys = memoryview(keys).cast('B').cast('Q')
+        self.entries = memoryview(entries).cast('B').cast('Q')
+        self.bucket_mask = len(self.entries) // self.BUCKET_SLOTS - 1
+        self.size_mb = len(self.entries) * self.SLOT_BYTES / (1024 * 1024)
+        self.generation = 0
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0 # probes that found the bucket filled by other positions
+        self.stores = 0
+        self.overwrites = 0 # stores that evicted a different position
+
+    # empties the table (keeps the stats)
+    def clear(self):
+        self.keys[:] = array('Q', bytes(8 * len(self.keys)))
+        self.entries[:] = array('Q', bytes(8 * len(self.entries)))
+
+    # called once per search so entries left over from earlier moves lose their claim on the depth-preferred slots
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    # entry layout, low bits first: used flag (1), bound (2), depth (8), generation (8), move id + 1 (16), score (24)
+    def pack(self, depth, score, bound, move_id):
+        return (1 | bound << 1 | depth << 3 | self.generation << 11 | (move_id + 1) << 19
+                | (score + self.SCORE_OFFSET) << 35)
+
+    # returns (depth, score, bound, move_id) stored for key, or None; move_id is -1 when no best move was stored
+    def probe(self, key):
+        self.probes += 1
+        slot = (key & self.bucket_mask) * self.BUCKET_SLOTS
+        for i in range(slot, slot + self.BUCKET_SLOTS):
+            entry = self.entries[i]
+            if entry and self.keys[i] ^ entry == key:
+                self.hits += 1
+                return (entry >> 3 & 0xFF, (entry >> 35) - self.SCORE_OFFSET, entry >> 1 & 3,
+                        (entry >> 19 & 0xFFFF) - 1)
+        if self.entries[slot]:
+            self.collisions += 1
+        return None
+
+    def store(self, key, depth, score, bound, move_id=-1):
+        self.stores += 1
+        slot = (key & self.bucket_mask) * self.BUCKET_SLOTS
+        preferred = self.entries[slot]
+        if (not preferred or self.keys[slot] ^ preferred == key or (preferred >> 11 & 0xFF) != self.generation
+                or depth >= (preferred >> 3 & 0xFF)):
+            target = slot
+        else:
+            target = slot + 1
+        stored = self.entries[target]
+        if stored and self.keys[target] ^ stored != key:
+            self.overwrites += 1
+        entry = self.pack(depth, score, bound, move_id)
+        self.keys[target] = key ^ entry
+        self.entries[target] = entry
+
+    # share of slots in use (sampled from the first thousand buckets)
+    def fill_rate(self):
+        sample = min(len(self.entries), 1000 * self.BUCKET_SLOTS)
+        return sum(1 for i in range(sample) if self.entries[i]) / sample
+
+    def get_stats(self):
+        return {
+            "size_mb": self.size_mb,
+            "slots": len(self.entries),
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "fill_rate": self.fill_rate(),
+        }
+
+
+# orders moves between generation and search so the ones most likely to cause a beta cutoff come first:
+# hash move, captures by most valuable victim / least valuable attacker, promotions, killer moves of the ply, then the
+# remaining quiet moves by their history score
+class MoveOrdering():
+
+    KILLERS_PER_PLY = 2
+    # victim/attacker values for MVV-LVA, by piece type (pawn, knight, bishop, rook, queen, king)
+    ORDER_VALUES = (1, 3, 3, 5, 9, 20)
+    HASH_MOVE_SCORE = 1 << 30
+    CAPTURE_SCORE = 1 << 28
+    PROMOTION_SCORE = CAPTURE_SCORE - 1
+    KILLER_SCORE = 1 << 26
 
     def __init__(self):
-        self.pawn_table = np.array([
-            [ 0,  0,  0,  0,  0,  0,  0,  0],
-            [ 5, 10, 10,-20,-20, 10, 10,  5],
-            [ 5, -5,-10,  0,  0,-10, -5,  5],
-            [ 0,  0,  0, 20, 20,  0,  0,  0],
-            [ 5,  5, 10, 25, 25, 10,  5,  5],
-            [10, 10, 20, 30, 30, 20, 10, 10],
-            [50, 50, 50, 50, 50, 50, 50, 50],
-            [ 0,  0,  0,  0,  0,  0,  0,  0]
-        ])
+        self.killers = [] # killers[ply]: quiet move ids that caused a cutoff at that ply, newest first
+        # history[side][move id]: how often (weighted by depth) a quiet move caused a cutoff
+        self.history = [[0] * 4096, [0] * 4096]
+        self.reset_stats()
 
-        self.knight_table = np.array([
-            [-50, -40, -30, -30, -30, -30, -40, -50],
-            [-40, -20,   0,   5,   5,   0, -20, -40],
-            [-30,   5,  10,  15,  15,  10,   5, -30],
-            [-30,   0,  15,  20,  20,  15,   0, -30],
-            [-30,   5,  15,  20,  20,  15,   0, -30],
-            [-30,   0,  10,  15,  15,  10,   0, -30],
-            [-40, -20,   0,   0,   0,   0, -20, -40],
-            [-50, -40, -30, -30, -30, -30, -40, -50]
-        ])
+    def reset_stats(self):
+        self.cutoffs = 0
+        self.first_move_cutoffs = 0
 
-        self.bishop_table = np.array([
-            [-20, -10, -10, -10, -10, -10, -10, -20],
-            [-10,   5,   0,   0,   0,   0,   5, -10],
-            [-10,  10,  10,  10,  10,  10,  10, -10],
-            [-10,   0,  10,  10,  10,  10,   0, -10],
-            [-10,   5,   5,  10,  10,   5,   5, -10],
-            [-10,   0,   5,  10,  10,   5,   0, -10],
-            [-10,   0,   0,   0,   0,   0,   0, -10],
-            [-20, -10, -10, -10, -10, -10, -10, -20]
-        ])
+    # killers only make sense for the search that found them; history is kept but halved so it slowly forgets
+    def new_search(self):
+        self.killers = []
+        for side_history in self.history:
+            for i in range(len(side_history)):
+                side_history[i] >>= 1
 
-        self.rook_table = np.array([
-            [ 0,  0,  0,  5,  5,  0,  0,  0],
-            [-5,  0,  0,  0,  0,  0,  0, -5],
-            [-5,  0,  0,  0,  0,  0,  0, -5],
-            [-5,  0,  0,  0,  0,  0,  0, -5],
-            [-5,  0,  0,  0,  0,  0,  0, -5],
-            [-5,  0,  0,  0,  0,  0,  0, -5],
-            [ 5, 10, 10, 10, 10, 10, 10,  5],
-            [ 0,  0,  0,  0,  0,  0,  0,  0]
-        ])
+    def is_quiet(self, move):
+        return not move & (ChessEngine.CAPTURE | PROMOTION)
 
-        self.queen_table = np.array([
-            [-20, -10, -10, -5, -5, -10, -10, -20],
-            [-10,   0,   5,  0,  0,   0,   0, -10],
-            [-10,   5,   5,  5,  5,   5,   0, -10],
-            [  0,   0,   5,  5,  5,   5,   0,  -5],
-            [ -5,   0,   5,  5,  5,   5,   0,  -5],
-            [-10,   0,   5,  5,  5,   5,   0, -10],
-            [-10,   0,   0,  0,  0,   0,   0, -10],
-            [-20, -10, -10, -5, -5, -10, -10, -20]
-        ])
+    # sorts moves in place, best candidates first
+    def order(self, moves, hash_move_id, ply):
+        killers = self.killers[ply] if ply < len(self.killers) else ()
+        history = self.history[0 if moves and (moves[0] >> 12 & 15) < 6 else 1]
+        order_values = self.ORDER_VALUES
+
+        def move_score(move):
+            move_id = move & MOVE_SQUARES
+            if move_id == hash_move_id:
+                return self.HASH_MOVE_SCORE
+            captured = move >> 16 & 15
+            if captured:
+                return self.CAPTURE_SCORE + 10 * order_values[(captured - 1) % 6] - order_values[(move >> 12 & 15) % 6]
+            if move & PROMOTION:
+                return self.PROMOTION_SCORE
+            if move_id in killers:
+                return self.KILLER_SCORE - killers.index(move_id)
+            return history[move_id]
+
+        moves.sort(key=move_score, reverse=True)
+
+    # called when the move at index move_number of a node at ply caused a beta cutoff
+    def record_cutoff(self, move, depth, ply, move_number):
+        self.cutoffs += 1
+        if move_number == 0:
+            self.first_move_cutoffs += 1
+        if not self.is_quiet(move):
+            return
+        while len(self.killers) <= ply:
+            self.killers.append([])
+        killers = self.killers[ply]
+        move_id = move & MOVE_SQUARES
+        if move_id not in killers:
+            killers.insert(0, move_id)
+            del killers[self.KILLERS_PER_PLY:]
+        self.history[0 if (move >> 12 & 15) < 6 else 1][move_id] += depth * depth
+
+    # share of beta cutoffs produced by the first move searched: how close the ordering gets to perfect
+    def first_move_cutoff_rate(self):
+        return self.first_move_cutoffs / self.cutoffs if self.cutoffs else 0.0
+
+
+# profile of the searches of an AI: nodes and quiescence nodes per ply, beta cutoffs, evaluation and move generation
+# calls with the time spent in them, and the outcome (depth, score, move, principal variation)
+# attach one with AI(stats=SearchStats()) (or ai.stats = SearchStats()) and every generate_smart_move fills it in anew
+# the counting is done by wrappers put around the AI's methods (and the move generator of the searched position)
+# only for the duration of a search, so an AI without stats searches exactly as fast as before
+class SearchStats():
+
+    def __init__(self):
+        self.reset()
 
-        self.king_table = np.array([
-            [ 20,  30,  10,   0,   0,  10,  30,  20],
-            [ 20,  20,   0,   0,   0,   0,  20,  20],
-            [-10, -20, -20, -20, -20, -20, -20, -10],
-            [-20, -30, -30, -40, -40, -30, -30, -20],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30],
-            [-30, -40, -40, -50, -50, -40, -40, -30]
+    def reset(self):
+        # per ply from the root (index 0 is the root itself, which search_root handles without a negamax node)
+        self.nodes_per_ply = []
+        self.quiescence_nodes_per_ply = []
+        self.cutoffs_per_ply = []
+        self.first_move_cutoffs = 0
+        self.evaluations = 0
+        self.evaluation_seconds = 0.0
+        self.move_generations = 0
+        self.move_generation_seconds = 0.0
+        self.start_time = None
+        self.seconds = 0.0
+        self.nodes = 0
+        self.depth = -1
+        self.score = None
+        self.move = None
+        self.pv = []
+
+    # adds one to counts[ply], growing the list as the search gets deeper
+    def count(self, counts, ply):
+        while len(counts) <= ply:
+            counts.append(0)
+        counts[ply] += 1
+
+    # wraps the methods the counters follow; called by generate_smart_move before it searches gs
+    def begin(self, ai, gs):
+        self.reset()
+        self.start_time = time.perf_counter()
+        negamax, quiescence = ai.negamax, ai.quiescence
+        static_evaluation, evaluate_batch = ai.static_evaluation, ai.evaluate_batch
+        record_cutoff, get_valid_moves = ai.ordering.record_cutoff, gs.get_valid_moves
+        perf_counter = time.perf_counter
+
+        def counted_negamax(gs, depth, ply, alpha, beta, difficulty, allow_null=True):
+            self.count(self.nodes_per_ply, ply)
+            return negamax(gs, depth, ply, alpha, beta, difficulty, allow_null)
+
+        def counted_quiescence(gs, alpha, beta, difficulty, ply, qply):
+            self.count(self.quiescence_nodes_per_ply, ply)
+            return quiescence(gs, alpha, beta, difficulty, ply, qply)
+
+        def counted_record_cutoff(move, depth, ply, move_number):
+            self.count(self.cutoffs_per_ply, ply)
+            if move_number == 0:
+                self.first_move_cutoffs += 1
+            record_cutoff(move, depth, ply, move_number)
+
+        def timed_static_evaluation(gs, difficulty):
+            start = perf_counter()
+            score = static_evaluation(gs, difficulty)
+            self.evaluation_seconds += perf_counter() - start
+            self.evaluations += 1
+            return score
+
+        def timed_evaluate_batch(planes, difficulty=2):
+            start = perf_counter()
+            scores = evaluate_batch(planes, difficulty)
+            self.evaluation_seconds += perf_counter() - start
+            self.evaluations += len(scores)
+            return scores
+
+        def timed_get_valid_moves(captures_only=False):
+            start = perf_counter()
+            moves = get_valid_moves(captures_only)
+            self.move_generation_seconds += perf_counter() - start
+            self.move_generations += 1
+            return moves
+
+        ai.negamax, ai.quiescence = counted_negamax, counted_quiescence
+        ai.static_evaluation, ai.evaluate_batch = timed_static_evaluation, timed_evaluate_batch
+        ai.ordering.record_cutoff = counted_record_cutoff
+        gs.get_valid_moves = timed_get_valid_moves
+
+    # takes the wrappers off again and records the outcome of the search; move is the move it returned
+    def end(self, ai, gs, move):
+        for name in ("negamax", "quiescence", "static_evaluation", "evaluate_batch"):
+            ai.__dict__.pop(name, None)
+        ai.ordering.__dict__.pop("record_cutoff", None)
+        gs.__dict__.pop("get_valid_moves", None)
+        self.seconds = time.perf_counter() - self.start_time
+        self.nodes = ai.nodes
+        self.depth = ai.completed_depth
+        self.score = ai.best_score
+        self.move = move
+        self.pv = []
+        if move is not None:
+            # the root isn't stored in the table, the line is followed from the position after move
+            gs.make_move(move)
+            self.pv = [move] + ai.get_pv(gs)
+            gs.undo_move()
+
+    # everything above as a dict of plain numbers and strings (moves in long algebraic notation like e2e4)
+    def summary(self):
+        cutoffs = sum(self.cutoffs_per_ply)
+        interior = self.nodes_per_ply[:len(self.cutoffs_per_ply)]
+        return {
+            "depth": self.depth, "score": self.score,
+            "move": move_notation(self.move) if self.move is not None else None,
+            "pv": [move_notation(move) for move in self.pv],
+            "seconds": round(self.seconds, 4), "nodes": self.nodes,
+            "nps": round(self.nodes / self.seconds) if self.seconds else 0,
+            "nodes_per_ply": self.nodes_per_ply, "quiescence_nodes_per_ply": self.quiescence_nodes_per_ply,
+            "quiescence_nodes": sum(self.quiescence_nodes_per_ply),
+            "cutoffs_per_ply": self.cutoffs_per_ply,
+            # share of the nodes of each ply that failed high
+            "cutoff_rate_per_ply": [round(cutoffs_at / nodes_at, 4) if nodes_at else 0.0
+                                    for cutoffs_at, nodes_at in zip(self.cutoffs_per_ply, interior)],
+            "first_move_cutoff_rate": round(self.first_move_cutoffs / cutoffs, 4) if cutoffs else 0.0,
+            "evaluations": self.evaluations, "evaluation_seconds": round(self.evaluation_seconds, 4),
+            "move_generations": self.move_generations,
+            "move_generation_seconds": round(self.move_generation_seconds, 4),
+        }
+
+    def to_json(self):
+        return json.dumps(self.summary())
+
+    # a few lines of text for a console
+    def format(self):
+        summary = self.summary()
+        return "\n".join([
+            f"depth {summary['depth']} score {summary['score']} pv {' '.join(summary['pv'])}",
+            f"{summary['nodes']} nodes ({summary['quiescence_nodes']} quiescence) in {summary['seconds']:.2f}s, "
+            f"{summary['nps']:,} nodes/s",
+            f"from ply 1: nodes {summary['nodes_per_ply'][1:]}, quiescence {summary['quiescence_nodes_per_ply'][1:]}",
+            f"cutoff rate {' '.join(f'{rate:.0%}' for rate in summary['cutoff_rate_per_ply'][1:])}, "
+            f"first move cutoffs {summary['first_move_cutoff_rate']:.0%}",
+            f"{summary['move_generations']} move generations in {summary['move_generation_seconds'] * 1000:.0f} ms, "
+            f"{summary['evaluations']} evaluations in {summary['evaluation_seconds'] * 1000:.0f} ms",
         ])
 
-        self.piece_scores = {'p': 10, 'B': 30, 'N': 30,
-                             'R': 50, 'Q': 90, 'K': 900}  # stores the weight of each piece in a dictionary
+
+class AI():
+
+    # tt_size_mb is the memory budget of the transposition table (0 searches without one)
+    # quiescence=False evaluates the horizon positions as they are instead of playing out the captures first
+    # batch_leaves=True evaluates all the children of a frontier node (depth 1) in one evaluate_batch call instead
+    # of searching them one by one; those leaves get the static evaluation, without quiescence search
+    # book is an optional book.OpeningBook: positions found in it are answered with a book move without searching
+    # tablebases is an optional tablebase.Tablebases: the search scores the positions they cover from the tables
+    # stats is an optional SearchStats, filled in by every search
+    # null_move, late_move_reductions and check_extensions switch those parts of the search off when False (to measure
+    # what they bring; see benchmarks/depth_bench.py)
+    def __init__(self, tt_size_mb=16, quiescence=True, batch_leaves=False, book=None, tablebases=None, stats=None,
+                 null_move=True, late_move_reductions=True, check_extensions=True):
+        self.use_quiescence = quiescence
+        self.null_move = null_move
+        self.late_move_reductions = late_move_reductions
+        self.check_extensions = check_extensions
+        self.stats = stats
+        self.book = book
+        self.tablebases = tablebases
+        self.batch_leaves = batch_leaves
+        self.tt = TranspositionTable(tt_size_mb) if tt_size_mb else None
+        self.ordering = MoveOrdering()
+        self.nodes = 0 # positions visited by the search during the last generate_smart_move
+        self.max_ply = 0 # check extensions stop at this ply, so the lines of checks can't run away (set by search_root)
+        # limits of the search in progress (set by generate_smart_move)
+        self.deadline = None
+        self.node_limit = None
+        self.stop_event = threading.Event()
+        self.shared_stop = None # optional multiprocessing.Event that stops the searches of several processes at once
+        # deepest iteration finished by the last generate_smart_move, its score and its move (-1/None if none finished)
+        self.completed_depth = -1
+        self.best_score = None
+        self.best_move = None
+        # piece position tables (module constants, see PAWN_TABLE)
+        self.pawn_table = PAWN_TABLE
+        self.knight_table = KNIGHT_TABLE
+        self.bishop_table = BISHOP_TABLE
+        self.rook_table = ROOK_TABLE
+        self.queen_table = QUEEN_TABLE
+        self.king_table = KING_TABLE
+
+        # in centipawns, the same scale as the position tables
+        self.piece_scores = {'p': 100, 'B': 300, 'N': 300,
+                             'R': 500, 'Q': 900, 'K': 9000}  # stores the weight of each piece in a dictionary
+        # value of the piece a packed move captures, indexed by its captured-piece bits
+        self.capture_values = [0] + [self.piece_scores[piece[1]] for piece in ChessEngine.PIECES]
+
+        # the tables above laid out for GameState.set_score_tables: indexed by piece index and square, white
+        # pieces positive and black negative (the tables are written from white's side, row 0 being the first rank,
+        # so white reads them upside down relative to the board and black reads them as they are)
+        tables = {'p': self.pawn_table, 'N': self.knight_table, 'B': self.bishop_table,
+                  'R': self.rook_table, 'Q': self.queen_table, 'K': self.king_table}
+        self.material_values = []
+        self.position_values = []
+        for piece in ChessEngine.PIECES:
+            sign = 1 if piece[0] == 'w' else -1
+            table = tables[piece[1]]
+            self.material_values.append(sign * self.piece_scores[piece[1]])
+            self.position_values.append([sign * int(table[7 - r][c] if sign == 1 else table[r][c])
+                                         for r in range(8) for c in range(8)])
+
+        self.batch_weights = None # weights of evaluate_batch, made by its first call
 
     # returns random valid move
     def generate_random_move(self, valid_moves):
@@ -83,9 +543,9 @@ class AI():
         # declaring check/stalemate
         if gs.check_mate:
             if gs.white_to_move:
-                return -9999 #min player (black) wins
+                return -CHECKMATE #min player (black) wins
             else:
-                return 9999 # max player (white) wins
+                return CHECKMATE # max player (white) wins
         elif gs.stale_mate:
             return 0
 
@@ -96,28 +556,56 @@ class AI():
         # declaring check/stalemate (terminal state)
         if gs.check_mate:
             if gs.white_to_move:
-                return -9999  # min player (black) wins
+                return -CHECKMATE  # min player (black) wins
             else:
-                return 9999  # max player (white) wins
+                return CHECKMATE  # max player (white) wins
         elif gs.stale_mate:
             return 0
 
+        # white is max / black is min (scores are always from white's point of view, like evaluate_simple)
+        return self.get_material_score(board) + self.get_all_position_scores(board)
+
+    # evaluation without the check/stalemate test, used inside the search: the flags on gs belong to whichever
+    # position last generated all of its moves, which isn't necessarily this one (the search detects mates itself)
+    # reads the running totals gs keeps of this AI's tables, so it costs the same however many pieces are left
+    def static_evaluation(self, gs, difficulty):
+        if difficulty == 1:
+            return gs.material_score
+        return gs.material_score + gs.position_score
+
+    # scores a whole batch of positions in one vectorized pass: planes is an (N, 12, 8, 8) piece plane array (see
+    # board_to_planes/bitboards_to_planes), the result holds the N static evaluations (same values as
+    # static_evaluation gives for those positions)
+    def evaluate_batch(self, planes, difficulty=2):
+        np = load_numpy()
+        if self.batch_weights is None:
+            # the tables as (12 * 8 * 8) weight vectors, one per difficulty: a position's score is the dot product of
+            # its flattened piece planes with the weights
+            material_planes = np.repeat(np.array(self.material_values, dtype=np.float64), 64)
+            self.batch_weights = {1: material_planes,
+                                  2: material_planes + np.array(self.position_values, dtype=np.float64).reshape(-1)}
+        planes = np.asarray(planes).reshape(-1, self.batch_weights[difficulty].size)
+        return np.rint(planes @ self.batch_weights[difficulty]).astype(np.int64)
+
+    # static evaluations of a list of GameStates
+    def evaluate_positions(self, game_states, difficulty=2):
+        return self.evaluate_batch(bitboards_to_planes([gs.bitboards for gs in game_states]), difficulty)
+
+    # makes gs keep running totals of this AI's evaluation tables (needed before static_evaluation is used on it)
+    def attach(self, gs):
+        if gs.material_values is not self.material_values:
+            gs.set_score_tables(self.material_values, self.position_values)
+
+    # sum of the piece position scores of every piece type
+    def get_all_position_scores(self, board):
         # stores piece position scores for each piece
-        material_score = self.get_material_score(board)
         pawns = self.get_position_score(board, 'p',self.pawn_table)
         knights = self.get_position_score(board, 'N', self.knight_table)
         bishops = self.get_position_score(board, 'B', self.bishop_table)
         rooks = self.get_position_score(board, 'R', self.rook_table)
         queens = self.get_position_score(board, 'Q', self.queen_table)
         kings = self.get_position_score(board, 'K', self.king_table)
-
-        eval_score = material_score + pawns + bishops + knights + rooks + queens + kings
-
-        # white is max / black is min
-        if gs.white_to_move:
-            return eval_score
-        else:
-            return -eval_score
+        return pawns + bishops + knights + rooks + queens + kings
 
     # returns the material score: weighted sum of w pieces on board - weighted sum of b pieces on board
     def get_material_score (self, board):
@@ -137,58 +625,432 @@ class AI():
     def get_position_score (self, board, piece_type, table):
         white_position_score = 0
         black_position_score = 0
-        for r in range (0, 1, 8):
-            for c in range (0, 1, 8):
+        for r in range (8):
+            for c in range (8):
                 piece = board[r][c]
                 if piece != "**":
                     if piece[1] == piece_type:
                         if piece[0] == 'w':
-                            white_position_score += table[r][c]  # using values in 2d array tables
+                            white_position_score += table[7-r][c]  # using values in 2d array tables
                         elif piece[0] == 'b':
-                            black_position_score += table[7-r][c]
+                            black_position_score += table[r][c]
         return white_position_score - black_position_score
 
-    # returns smart move with depth 2
-    def generate_smart_move(self, gs, depth, difficulty):
-        best_score = 9999
+    # returns the best move by iterative deepening: searches depth 0, 1, ... up to depth below the root move, each
+    # iteration trying the previous best move first inside a narrow window around its score
+    # time_limit (seconds) and node_limit end the search early; the move of the last completed depth is returned
+    # positions in the opening book get a book move straight away (completed_depth stays -1)
+    def generate_smart_move(self, gs, depth, difficulty, time_limit=None, node_limit=None):
+        stats = self.stats
+        if stats is None:
+            return self.iterative_deepening(gs, depth, difficulty, time_limit, node_limit)
+        move = None
+        stats.begin(self, gs)
+        try:
+            move = self.iterative_deepening(gs, depth, difficulty, time_limit, node_limit)
+        finally:
+            stats.end(self, gs, move)
+        return move
+
+    def iterative_deepening(self, gs, depth, difficulty, time_limit, node_limit):
+        start_time = self.start_search(gs, time_limit, node_limit)
+        if self.book is not None:
+            book_move = self.book.choose_move(gs)
+            if book_move is not None:
+                return book_move
         valid_moves = gs.get_valid_moves()
+        if len(valid_moves) == 0:
+            return None
+        self.ordering.order(valid_moves, -1, 0)
         best_move = valid_moves[0]
-        for move in valid_moves:
+        log_length = len(gs.move_log)
+        try:
+            for current_depth in range(depth + 1):
+                self.best_score, best_move = self.aspiration_search(gs, valid_moves, current_depth, self.best_score, difficulty)
+                self.completed_depth = current_depth
+                self.best_move = best_move
+                valid_moves.remove(best_move)
+                valid_moves.insert(0, best_move)
+                # the next iteration takes several times longer than this one, don't start it without the time to finish
+                if self.deadline is not None and time.perf_counter() - start_time > (self.deadline - start_time) / 2:
+                    break
+        except SearchStopped:
+            # the search was abandoned in the middle of the tree: take back the moves it had made on gs
+            while len(gs.move_log) > log_length:
+                gs.undo_move()
+        return best_move
+
+    # resets the counters, limits and tables for a new search rooted at gs; returns its start time
+    def start_search(self, gs, time_limit, node_limit):
+        self.nodes = 0
+        start_time = time.perf_counter()
+        self.deadline = start_time + time_limit if time_limit is not None else None
+        self.node_limit = node_limit
+        self.stop_event.clear()
+        self.completed_depth = -1
+        self.best_score = None
+        self.best_move = None
+        if self.tt is not None:
+            self.tt.new_search()
+        self.ordering.new_search()
+        self.ordering.reset_stats()
+        self.attach(gs)
+        return start_time
+
+    # score of playing move in gs, searching the reply depth plies deep like one root move of search_root (the parallel
+    # root split scores the root moves this way); exact inside (alpha, beta), otherwise only a bound like negamax's
+    # returns None if the time limit ran out
+    def score_move(self, gs, move, depth, difficulty, time_limit=None, alpha=-CHECKMATE, beta=CHECKMATE):
+        self.start_search(gs, time_limit, None)
+        log_length = len(gs.move_log)
+        gs.make_move(move)
+        self.max_ply = 2 * (depth + 1)
+        # alpha and beta are from white's point of view, negamax's window from the side to move's
+        sign = 1 if gs.white_to_move else -1
+        try:
+            self.best_score = sign * self.negamax(gs, depth, 1, *((alpha, beta) if sign == 1 else (-beta, -alpha)), difficulty)
+            self.completed_depth = depth
+        except SearchStopped:
+            self.best_score = None
+        while len(gs.move_log) > log_length:
+            gs.undo_move()
+        return self.best_score
+
+    # asks a search running in another thread to stop; it returns the best move of its last completed depth
+    def stop(self):
+        self.stop_event.set()
+
+    # principal variation from gs as far as the transposition table knows it: the stored best move of each position
+    # along the line, at most max_length moves (empty without a table)
+    def get_pv(self, gs, max_length=8):
+        pv = []
+        seen = set()
+        while self.tt is not None and len(pv) < max_length and gs.zobrist_key not in seen:
+            seen.add(gs.zobrist_key)
+            entry = self.tt.probe(gs.zobrist_key)
+            if entry is None:
+                break
+            move = next((move for move in gs.get_valid_moves() if move & MOVE_SQUARES == entry[3]), None)
+            if move is None:
+                break
+            pv.append(move)
             gs.make_move(move)
-            current_eval = self.minimax(gs, depth, -9999, 9999, True, difficulty)
+        for _ in pv:
             gs.undo_move()
-            if (current_eval < best_score):
+        return pv
+
+    def check_limits(self):
+        if self.stop_event.is_set() or (self.shared_stop is not None and self.shared_stop.is_set()):
+            raise SearchStopped()
+        if self.deadline is not None and time.perf_counter() >= self.deadline:
+            raise SearchStopped()
+        if self.node_limit is not None and self.nodes >= self.node_limit:
+            raise SearchStopped()
+
+    # root search inside an aspiration window around the previous score, widened and repeated when the score falls
+    # outside it
+    def aspiration_search(self, gs, root_moves, depth, previous_score, difficulty):
+        if previous_score is None:
+            return self.search_root(gs, root_moves, depth, -CHECKMATE, CHECKMATE, difficulty)
+        window = ASPIRATION_WINDOW
+        alpha, beta = previous_score - window, previous_score + window
+        while True:
+            score, move = self.search_root(gs, root_moves, depth, alpha, beta, difficulty)
+            if score <= alpha and alpha > -CHECKMATE: # failed low
+                window *= 4
+                alpha = max(previous_score - window, -CHECKMATE)
+            elif score >= beta and beta < CHECKMATE: # failed high
+                window *= 4
+                beta = min(previous_score + window, CHECKMATE)
+            else:
+                return score, move
+
+    # returns (score, best move) of the root position, both scores and window from white's point of view like
+    # every score generate_smart_move reports
+    # the first move gets the full window; the others are only tested against the best score so far with a null
+    # window (principal variation search) and searched again with the full window when they beat it
+    def search_root(self, gs, root_moves, depth, alpha, beta, difficulty):
+        self.max_ply = 2 * (depth + 1)
+        sign = 1 if gs.white_to_move else -1
+        if sign == -1:
+            alpha, beta = -beta, -alpha
+        best_score = -CHECKMATE - 1 # worse than being mated, so some move is picked
+        best_move = root_moves[0]
+        for i, move in enumerate(root_moves):
+            gs.make_move(move)
+            if i == 0:
+                current_eval = -self.negamax(gs, depth, 1, -beta, -alpha, difficulty)
+            else:
+                current_eval = -self.negamax(gs, depth, 1, -alpha - 1, -alpha, difficulty)
+                if alpha < current_eval < beta:
+                    current_eval = -self.negamax(gs, depth, 1, -beta, -alpha, difficulty)
+            gs.undo_move()
+            if current_eval > best_score:
                 best_score = current_eval
                 best_move = move
-        return best_move
+                alpha = max(alpha, current_eval)
+            if beta <= alpha:
+                break
+        return sign * best_score, best_move
 
-    # returns the best move and the min/max evaluation function score (uses AB-pruning)
-    def minimax(self, gs, depth, alpha, beta, max_player, difficulty):
+    # score of gs from the point of view of the side to move (negamax: a child's score is minus its parent's), searched
+    # depth plies deep; ply counts the plies from the root
+    # principal variation search: the first (best ordered) move gets the window, the rest a null window and are searched
+    # again with the window only when they beat alpha
+    # positions already searched at least as deep are answered from the transposition table when the stored score
+    # settles this window
+    # null move pruning: when even passing the turn keeps the score above beta, the node is cut off without searching
+    # its moves (not in check, and not when the side to move has only pawns left, where passing could be the best
+    # move there is: zugzwang)
+    # late move reductions: quiet moves late in the ordering are searched shallower first
+    # check extensions: positions in check are searched a ply deeper
+    def negamax(self, gs, depth, ply, alpha, beta, difficulty, allow_null=True):
+        self.nodes += 1
+        if self.nodes & 255 == 0:
+            self.check_limits()
+        if self.tablebases is not None and gs.occupied.bit_count() <= self.tablebases.max_pieces:
+            score = self.tablebase_score(gs, ply)
+            if score is not None:
+                return score
+        in_check = gs.in_check()
+        if in_check and self.check_extensions and ply < self.max_ply:
+            depth += 1
         # using different evaluation functions depending on difficulty chosen by the user
-        if depth == 0: # base case
-            if difficulty == 1:
-                return self.evaluate_simple(gs, gs.board)
-            if difficulty == 2:
-                return self.evaluate_complex(gs, gs.board)
+        if depth <= 0: # base case
+            if self.use_quiescence:
+                return self.quiescence(gs, alpha, beta, difficulty, ply, 0)
+            return self.relative_evaluation(gs, difficulty)
+
+        alpha_original = alpha
+        hash_move_id = -1
+        entry = self.tt.probe(gs.zobrist_key) if self.tt is not None else None
+        if entry is not None:
+            entry_depth, entry_score, bound, hash_move_id = entry
+            entry_score = self.score_from_table(entry_score, ply)
+            if entry_depth >= depth:
+                if bound == EXACT or (bound == LOWER_BOUND and entry_score >= beta) or (bound == UPPER_BOUND and entry_score <= alpha):
+                    return entry_score
+
+        if (self.null_move and allow_null and not in_check and depth >= NULL_MOVE_MIN_DEPTH and beta - alpha == 1
+                and self.has_pieces(gs) and self.relative_evaluation(gs, difficulty) >= beta):
+            reduction = NULL_MOVE_REDUCTION + (depth > 6)
+            gs.make_null_move()
+            try:
+                # no null move right after another, which would just be the same position searched shallower
+                null_eval = -self.negamax(gs, depth - 1 - reduction, ply + 1, -beta, -beta + 1, difficulty, False)
+            finally:
+                # also when the search is stopped below it: generate_smart_move only takes back the real moves
+                gs.undo_null_move()
+            if null_eval >= beta:
+                return beta
+
         valid_moves = gs.get_valid_moves()
+        if len(valid_moves) == 0:
+            return self.terminal_score(gs, ply)
+        if depth == 1 and self.batch_leaves:
+            return self.search_frontier(gs, valid_moves, difficulty)
+        self.ordering.order(valid_moves, hash_move_id, ply)
+        best_eval = -CHECKMATE
+        best_move_id = -1
 
-        if max_player: # aims to maximize score
-            max_eval = -9999
-            for move in valid_moves:
-                gs.make_move(move)
-                max_eval = max(max_eval, self.minimax(gs, depth-1, alpha, beta, False, difficulty))
-                gs.undo_move()
-                alpha = max(alpha, max_eval)
-                if beta <= alpha:
-                    break
-            return max_eval
-        else: # aims to minimize score
-            min_eval = 9999
-            for move in valid_moves:
-                gs.make_move(move)
-                min_eval = min(min_eval, self.minimax(gs, depth - 1, alpha, beta, True, difficulty))
-                gs.undo_move()
-                beta = min(beta, min_eval)
-                if beta <= alpha:
-                    break
-            return min_eval
+        for i, move in enumerate(valid_moves):
+            gs.make_move(move)
+            if i == 0:
+                current_eval = -self.negamax(gs, depth - 1, ply + 1, -beta, -alpha, difficulty)
+            else:
+                reduction = 0
+                if (self.late_move_reductions and i >= LMR_FULL_DEPTH_MOVES and depth >= LMR_MIN_DEPTH and not in_check
+                        and self.ordering.is_quiet(move) and not gs.in_check()):
+                    reduction = 1 if i < LMR_DEEP_MOVES or depth < LMR_MIN_DEPTH + 1 else 2
+                current_eval = -self.negamax(gs, depth - 1 - reduction, ply + 1, -alpha - 1, -alpha, difficulty)
+                if reduction and current_eval > alpha:
+                    current_eval = -self.negamax(gs, depth - 1, ply + 1, -alpha - 1, -alpha, difficulty)
+                if alpha < current_eval < beta:
+                    current_eval = -self.negamax(gs, depth - 1, ply + 1, -beta, -alpha, difficulty)
+            gs.undo_move()
+            if current_eval > best_eval:
+                best_eval = current_eval
+                best_move_id = move & MOVE_SQUARES
+            alpha = max(alpha, best_eval)
+            if beta <= alpha:
+                self.ordering.record_cutoff(move, depth, ply, i)
+                break
+
+        if self.tt is not None:
+            if best_eval <= alpha_original:
+                bound = UPPER_BOUND
+            elif best_eval >= beta:
+                bound = LOWER_BOUND
+            else:
+                bound = EXACT
+            self.tt.store(gs.zobrist_key, depth, self.score_to_table(best_eval, ply), bound, best_move_id)
+        return best_eval
+
+    # the table keeps mate scores as distances from the position stored rather than from the root of the search that
+    # stored it, so they stay right when the position comes up at another ply
+    def score_to_table(self, score, ply):
+        if score > MATE_SCORE_BOUND:
+            return score + ply
+        if score < -MATE_SCORE_BOUND:
+            return score - ply
+        return score
+
+    def score_from_table(self, score, ply):
+        if score > MATE_SCORE_BOUND:
+            return score - ply
+        if score < -MATE_SCORE_BOUND:
+            return score + ply
+        return score
+
+    # static evaluation from the point of view of the side to move
+    def relative_evaluation(self, gs, difficulty):
+        score = self.static_evaluation(gs, difficulty)
+        return score if gs.white_to_move else -score
+
+    # whether the side to move has a piece other than pawns and its king (null moves are only tried then: with pawns
+    # alone, zugzwang is common)
+    def has_pieces(self, gs):
+        offset = (ChessEngine.WHITE if gs.white_to_move else ChessEngine.BLACK) * 6
+        bitboards = gs.bitboards
+        return bool(bitboards[offset + ChessEngine.KNIGHT] | bitboards[offset + ChessEngine.BISHOP]
+                    | bitboards[offset + ChessEngine.ROOK] | bitboards[offset + ChessEngine.QUEEN])
+
+    # score of a position at ply without legal moves for the side to move, right after gs.get_valid_moves() set its
+    # flags
+    def terminal_score(self, gs, ply):
+        return -(CHECKMATE - ply) if gs.check_mate else 0
+
+    # exact score of gs (at ply) for the side to move from the endgame tables, None if they don't cover it
+    # scored like the mates the search finds, by their distance from the root, so the search heads for the quickest
+    # mate (and the loser for the slowest)
+    def tablebase_score(self, gs, ply):
+        value = self.tablebases.probe(gs)
+        if value is None:
+            return None
+        if value > 0: # the side to move mates in value moves
+            return CHECKMATE - (ply + 2 * value - 1)
+        if value < 0: # the side to move is mated in -value - 1 moves
+            return -(CHECKMATE - (ply + 2 * (-value - 1)))
+        return 0
+
+    # searches only captures and promotions below the horizon until the position is quiet, so the evaluation
+    # doesn't stop halfway through an exchange; scores are for the side to move, like negamax's
+    # the side to move may "stand pat" on the static evaluation instead of capturing, unless it is in check, in which
+    # case every evasion is searched
+    def quiescence(self, gs, alpha, beta, difficulty, ply, qply):
+        self.nodes += 1
+        if self.nodes & 255 == 0:
+            self.check_limits()
+        in_check = gs.in_check()
+        if in_check:
+            moves = gs.get_valid_moves()
+            if len(moves) == 0:
+                return self.terminal_score(gs, ply)
+            stand_pat = None
+            best_eval = -CHECKMATE
+        else:
+            stand_pat = self.relative_evaluation(gs, difficulty)
+            best_eval = stand_pat
+            if stand_pat >= beta:
+                return stand_pat
+            alpha = max(alpha, stand_pat)
+        if qply >= QUIESCENCE_MAX_PLY:
+            return best_eval if stand_pat is not None else self.relative_evaluation(gs, difficulty)
+        if not in_check:
+            moves = gs.get_valid_moves(captures_only=True)
+        self.ordering.order(moves, -1, ply)
+
+        for move in moves:
+            # delta pruning: skip captures that can't bring the score back to the window even with a margin to spare
+            if stand_pat is not None and not move & PROMOTION:
+                if stand_pat + self.capture_values[move >> 16 & 15] + DELTA_MARGIN <= alpha:
+                    continue
+            gs.make_move(move)
+            current_eval = -self.quiescence(gs, -beta, -alpha, difficulty, ply + 1, qply + 1)
+            gs.undo_move()
+            best_eval = max(best_eval, current_eval)
+            alpha = max(alpha, best_eval)
+            if beta <= alpha:
+                break
+        return best_eval
+
+    # frontier node in batch_leaves mode: plays every move just long enough to copy the child's bitboards, then
+    # scores all the children with one evaluate_batch call (no alpha-beta cutoffs among them, so the value is exact)
+    def search_frontier(self, gs, valid_moves, difficulty):
+        children = []
+        for move in valid_moves:
+            gs.make_move(move)
+            children.append(gs.bitboards[:])
+            gs.undo_move()
+        self.nodes += len(children)
+        scores = self.evaluate_batch(bitboards_to_planes(children), difficulty)
+        best = int(scores.argmax() if gs.white_to_move else scores.argmin())
+        best_eval = int(scores[best]) if gs.white_to_move else -int(scores[best])
+        if self.tt is not None:
+            self.tt.store(gs.zobrist_key, 1, best_eval, EXACT, valid_moves[best] & MOVE_SQUARES)
+        return best_eval
+
+
+# runs an AI's searches in a background thread so the caller (the pygame loop) stays responsive: start a search,
+# poll() for its move every frame and cancel() it at any time
+# between moves the engine can ponder: search the position after the reply it expects from the opponent, and when
+# that reply is played ponder_hit() turns the running search into the real one, keeping everything it found so far
+class BackgroundSearch():
+
+    def __init__(self, ai):
+        self.ai = ai
+        self.thread = None
+        self.result = None
+        self.key = None # zobrist key of the position being searched
+        self.pondering = False
+        self.deadline = None # when poll() stops the search (for ponder searches, which run without a time limit)
+
+    # searches gs (a copy of it, gs itself can keep changing) in the background, after ponder_move when pondering
+    def start(self, gs, depth, difficulty, time_limit=None, ponder_move=None):
+        self.cancel()
+        position = gs.copy()
+        self.pondering = ponder_move is not None
+        if self.pondering:
+            position.make_move(ponder_move)
+            time_limit = None
+        self.key = position.zobrist_key
+        self.deadline = None
+        self.result = None
+        self.thread = threading.Thread(target=self.run, args=(position, depth, difficulty, time_limit), daemon=True)
+        self.thread.start()
+
+    def run(self, position, depth, difficulty, time_limit):
+        self.result = self.ai.generate_smart_move(position, depth, difficulty, time_limit)
+
+    def is_running(self):
+        return self.thread is not None
+
+    # the best move once the search for gs is over, None while it is still running (or only pondering)
+    def poll(self):
+        if self.thread is None or self.pondering:
+            return None
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            self.ai.stop() # asked again every frame in case it was sent before the search had started
+        if self.thread.is_alive():
+            return None
+        self.thread = None
+        return self.result
+
+    # the opponent played into gs: if it is the position being pondered, the search carries on as the real one with
+    # time_limit seconds left; returns whether it was
+    def ponder_hit(self, gs, time_limit=None):
+        if self.thread is None or not self.pondering or gs.zobrist_key != self.key:
+            return False
+        self.pondering = False
+        self.deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        return True
+
+    # stops and discards the running search
+    def cancel(self):
+        if self.thread is None:
+            return
+        while self.thread.is_alive():
+            self.ai.stop()
+            self.thread.join(0.01)
+        self.thread = None
+        self.pondering = False
@@ -2,81 +2,497 @@
 # Determines valid moves
 # Keeps move log
 
-import numpy as np
+# The position is stored as bitboards: one 64-bit integer per piece type and colour, where bit n is set when that
+# piece stands on square n. Squares are numbered row * 8 + col, so a8 = 0 and h1 = 63 (same orientation as the board
+# view used for drawing: row 0 is black's back rank)
+
+import random
+import re
+import threading
+from collections import OrderedDict
+
+PIECES = ('wp', 'wN', 'wB', 'wR', 'wQ', 'wK', 'bp', 'bN', 'bB', 'bR', 'bQ', 'bK')
+PIECE_INDEX = {piece: i for i, piece in enumerate(PIECES)}
+WHITE = 0
+BLACK = 1
+# piece type offsets inside each colour's block of PIECES (black pieces are at colour * 6 + type)
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+
+FULL_BOARD = (1 << 64) - 1
+FILE_A = 0x0101010101010101
+FILE_B = FILE_A << 1
+FILE_G = FILE_A << 6
+FILE_H = FILE_A << 7
+ROWS = [0xFF << (8 * r) for r in range(8)]
+PROMOTION_ROWS = ROWS[0] | ROWS[7]
+
+# random 64-bit numbers for Zobrist hashing: a position's key is the xor of one number per (piece, square) plus one
+# for black to move. The seed is fixed so keys are the same in every process and across runs
+_zobrist_random = random.Random(20240511)
+ZOBRIST_PIECES = [[_zobrist_random.getrandbits(64) for _ in range(64)] for _ in PIECES]
+ZOBRIST_BLACK_TO_MOVE = _zobrist_random.getrandbits(64)
+
+# files that would wrap around the board edge when shifting by dc columns
+NOT_WRAPPING = {-2: FULL_BOARD ^ (FILE_G | FILE_H), -1: FULL_BOARD ^ FILE_H, 0: FULL_BOARD,
+                1: FULL_BOARD ^ FILE_A, 2: FULL_BOARD ^ (FILE_A | FILE_B)}
+
+KNIGHT_DIRECTIONS = ((-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (1, -2), (-1, 2), (1, 2))
+KING_DIRECTIONS = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (0, -1), (1, -1), (1, 0), (1, 1))
+ROOK_DIRECTIONS = ((-1, 0), (1, 0), (0, -1), (0, 1))  # top, bottom, left, right
+BISHOP_DIRECTIONS = ((-1, -1), (-1, 1), (1, -1), (1, 1))  # top-left, top-right, bottom-left, bottom-right
+
+# Moves are packed into ints: bits 0-5 hold the start square, 6-11 the end square, 12-15 the index of the moving
+# piece in PIECES, 16-19 the index of the captured piece plus one (0 when the end square is empty) and bit 20 is set
+# for pawn promotions. Generation and search only ever handle these ints; Move wraps one for the GUI and notation
+MOVE_SQUARES = 0xFFF # start and end square, which tell the moves of one position apart (the move id)
+CAPTURE = 0xF << 16
+PROMOTION = 1 << 20
+EMPTY = -1 # piece_on value of an empty square
+FEN_LETTERS = "PNBRQKpnbrqk" # FEN letter of each piece index
+# EPD operation tokens: a quoted string, a bare word or the semicolon that ends an operation
+EPD_TOKEN = re.compile(r'"([^"]*)"|([^\s;"]+)|;')
+
+INITIAL_BOARD = [
+    ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
+    ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
+    ["**", "**", "**", "**", "**", "**", "**", "**"],
+    ["**", "**", "**", "**", "**", "**", "**", "**"],
+    ["**", "**", "**", "**", "**", "**", "**", "**"],
+    ["**", "**", "**", "**", "**", "**", "**", "**"],
+    ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
+    ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
+]
+
+
+# moves every bit of bb by dr rows and dc columns, dropping the bits that fall off the board
+def shift(bb, dr, dc):
+    s = dr * 8 + dc
+    if s > 0:
+        bb = (bb << s) & FULL_BOARD
+    else:
+        bb >>= -s
+    return bb & NOT_WRAPPING[dc]
+
+
+# squares reached by stepping once in each direction (knights and kings)
+def step_attacks(bb, directions):
+    attacks = 0
+    for dr, dc in directions:
+        attacks |= shift(bb, dr, dc)
+    return attacks
+
+
+# squares reached by sliding from bb in each direction until (and including) the first occupied square
+def sliding_attacks(bb, occupied, directions):
+    attacks = 0
+    for dr, dc in directions:
+        ray = bb
+        while True:
+            ray = shift(ray, dr, dc)
+            if not ray:
+                break
+            attacks |= ray
+            if ray & occupied:
+                break
+    return attacks
+
+
+# Attack tables, built once at import by build_attack_tables (a few milliseconds, see benchmarks/startup_bench):
+# KNIGHT_ATTACKS[sq] and KING_ATTACKS[sq] - squares a knight/king on sq attacks
+# PAWN_ATTACKS[colour][sq] - squares a pawn of that colour on sq attacks
+# RAYS[direction][sq] - squares from sq to the board edge in that direction, sq itself excluded
+# BETWEEN[a][b] - squares strictly between a and b when they share a row, column or diagonal (0 otherwise)
+def build_attack_tables():
+    knight_attacks = [step_attacks(1 << sq, KNIGHT_DIRECTIONS) for sq in range(64)]
+    king_attacks = [step_attacks(1 << sq, KING_DIRECTIONS) for sq in range(64)]
+    pawn_attacks = ([shift(1 << sq, -1, -1) | shift(1 << sq, -1, 1) for sq in range(64)],
+                    [shift(1 << sq, 1, -1) | shift(1 << sq, 1, 1) for sq in range(64)])
+    rays = {direction: [sliding_attacks(1 << sq, 0, (direction,)) for sq in range(64)]
+            for direction in ROOK_DIRECTIONS + BISHOP_DIRECTIONS}
+    between = [[0] * 64 for _ in range(64)]
+    for (dr, dc), direction_rays in rays.items():
+        opposite_rays = rays[(-dr, -dc)]
+        for a in range(64):
+            ray = direction_rays[a]
+            while ray:
+                bit = ray & -ray
+                ray ^= bit
+                b = bit.bit_length() - 1
+                between[a][b] = direction_rays[a] & opposite_rays[b]
+    return knight_attacks, king_attacks, pawn_attacks, rays, between
+
+
+KNIGHT_ATTACKS, KING_ATTACKS, PAWN_ATTACKS, RAYS, BETWEEN = build_attack_tables()
+# (rays of the direction, whether the direction runs towards higher square numbers) for slider_attacks: the nearest
+# blocker on a ray is its lowest set bit going up the board numbering and its highest going down
+ROOK_RAYS = tuple((RAYS[direction], direction[0] * 8 + direction[1] > 0) for direction in ROOK_DIRECTIONS)
+BISHOP_RAYS = tuple((RAYS[direction], direction[0] * 8 + direction[1] > 0) for direction in BISHOP_DIRECTIONS)
+QUEEN_RAYS = ROOK_RAYS + BISHOP_RAYS
+
+
+# squares a slider on sq attacks along the given rays: each ray is cut off behind its nearest blocker by removing the
+# blocker's own ray in the same direction
+def slider_attacks(sq, occupied, direction_rays):
+    attacks = 0
+    for rays, ascending in direction_rays:
+        ray = rays[sq]
+        blockers = ray & occupied
+        if blockers:
+            ray ^= rays[(blockers & -blockers).bit_length() - 1 if ascending else blockers.bit_length() - 1]
+        attacks |= ray
+    return attacks
+
+
+# {opcode: [operands]} of the operations of an EPD record, e.g. 'bm Qxf7+; id "WAC.001";'
+def parse_epd_operations(text):
+    operations = {}
+    opcode = None
+    for match in EPD_TOKEN.finditer(text):
+        quoted, word = match.groups()
+        if quoted is None and word is None: # end of the operation
+            opcode = None
+        elif opcode is None:
+            if word is None:
+                raise ValueError(f"EPD operation starting with a string in {text!r}")
+            opcode = word
+            operations[opcode] = []
+        else:
+            operations[opcode].append(word if word is not None else quoted)
+    return operations
+
 
-# Using a 2D list (consider using a numpy 2d array)
 class GameState():
 
     # Constructor
-    def __init__(self):
-
-        # Representing the board as a 2d numpy array
-        # b/w: black/white; second letter is the piece type
-        self.board = np.array([
-            ["bR", "bN", "bB", "bQ", "bK", "bB", "bN", "bR"],
-            ["bp", "bp", "bp", "bp", "bp", "bp", "bp", "bp"],
-            ["**", "**", "**", "**", "**", "**", "**", "**"],
-            ["**", "**", "**", "**", "**", "**", "**", "**"],
-            ["**", "**", "**", "**", "**", "**", "**", "**"],
-            ["**", "**", "**", "**", "**", "**", "**", "**"],
-            ["wp", "wp", "wp", "wp", "wp", "wp", "wp", "wp"],
-            ["wR", "wN", "wB", "wQ", "wK", "wB", "wN", "wR"]
-        ])
-
-        self.white_to_move = True
+    # debug=True recomputes the zobrist key (and the evaluation totals) from scratch after every move and raises if
+    # the incrementally updated values drifted
+    # move_cache is an optional MoveCache that get_valid_moves answers from (it can be shared between games)
+    # fen starts the game from that position instead of the initial one
+    def __init__(self, debug=False, move_cache=None, fen=None):
+
+        self.debug = debug
+        self.move_cache = move_cache
         self.move_log = []
-        self.white_king_location = (7,4)
-        self.black_king_location = (0,4)
         self.stale_mate = False
         self.check_mate = False
+        # evaluation tables installed by set_score_tables, and the running totals make_move/undo_move keep of them
+        self.material_values = None
+        self.position_values = None
+        self.material_score = 0
+        self.position_score = 0
+        # move counters of the loaded position, which get_fen carries on from
+        self.start_halfmove_clock = 0
+        self.start_move_number = 1
+        if fen is None:
+            self.set_board(INITIAL_BOARD)
+        else:
+            self.load_fen(fen)
+
+    # loads a position from a 2d array of piece strings ("**" for empty squares)
+    def set_board(self, board, white_to_move=True):
+        self.set_pieces([(PIECE_INDEX[board[r][c]], r * 8 + c) for r in range(8) for c in range(8) if board[r][c] != "**"],
+                        white_to_move)
+
+    # loads a position from (piece index, square) pairs
+    def set_pieces(self, pieces, white_to_move=True):
+        self.white_to_move = white_to_move
+        self.zobrist_key = 0 if white_to_move else ZOBRIST_BLACK_TO_MOVE
+        self.material_score = 0
+        self.position_score = 0
+        self.bitboards = [0] * len(PIECES)
+        self.occupancy = [0, 0]  # all white pieces, all black pieces
+        # square index map: piece_on[sq] is the index of the piece on sq (EMPTY if none), so telling which piece
+        # stands somewhere doesn't mean testing all twelve bitboards
+        self.piece_on = [EMPTY] * 64
+        for index, sq in pieces:
+            self.put_piece(index, sq)
+        self.occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        self.white_king_location = self.get_king_location(WHITE)
+        self.black_king_location = self.get_king_location(BLACK)
+        # keys of every position reached so far, one more entry than move_log (the first is the loaded position)
+        self.key_history = [self.zobrist_key]
+
+    # starts a new game from a FEN string; the castling and en passant fields are skipped, since neither exists in
+    # this engine, and the move counters are only kept for get_fen
+    def load_fen(self, fen):
+        fields = fen.split()
+        if not fields:
+            raise ValueError("empty FEN")
+        board = []
+        for fen_row in fields[0].split("/"):
+            row = []
+            for char in fen_row:
+                if char.isdigit():
+                    row.extend(["**"] * int(char))
+                elif char in FEN_LETTERS:
+                    row.append(PIECES[FEN_LETTERS.index(char)])
+                else:
+                    raise ValueError(f"bad piece {char!r} in FEN {fen!r}")
+            if len(row) != 8:
+                raise ValueError(f"bad FEN row {fen_row!r} in {fen!r}")
+            board.append(row)
+        if len(board) != 8:
+            raise ValueError(f"FEN {fen!r} doesn't have 8 rows")
+        if len(fields) > 1 and fields[1] not in ("w", "b"):
+            raise ValueError(f"bad side to move {fields[1]!r} in FEN {fen!r}")
+        for king in ("wK", "bK"):
+            if sum(row.count(king) for row in board) != 1:
+                raise ValueError(f"FEN {fen!r} needs exactly one {king}")
+        self.move_log = []
+        self.check_mate = False
+        self.stale_mate = False
+        self.start_halfmove_clock = int(fields[4]) if len(fields) > 4 else 0
+        self.start_move_number = int(fields[5]) if len(fields) > 5 else 1
+        self.set_board(board, len(fields) < 2 or fields[1] == "w")
+        # the side that just moved can't be left in check, its king could be taken and make_move can't play that
+        us = WHITE if self.white_to_move else BLACK
+        king = self.bitboards[(us ^ 1) * 6 + KING]
+        if self.attackers_to(king.bit_length() - 1, us, self.occupied):
+            raise ValueError(f"FEN {fen!r} has the side not to move in check")
 
-    # takes a move as parameter and executes it (doesn't work for castling, en-passant and pawn-promotion
+    # FEN string of the current position (castling and en passant are always "-")
+    def get_fen(self):
+        rows = []
+        for r in range(8):
+            row = ""
+            empty = 0
+            for index in self.piece_on[r * 8:r * 8 + 8]:
+                if index == EMPTY:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                row += FEN_LETTERS[index]
+            rows.append(row + (str(empty) if empty else ""))
+        # black's moves played since the loaded position; the move number goes up after each
+        black_moves = (len(self.move_log) + (self.white_to_move == (len(self.move_log) % 2 == 1))) // 2
+        return " ".join(("/".join(rows), "w" if self.white_to_move else "b", "-", "-", str(self.get_halfmove_clock()),
+                         str(self.start_move_number + black_moves)))
+
+    # plies since the last capture or pawn move
+    def get_halfmove_clock(self):
+        clock = 0
+        for move in reversed(self.move_log):
+            if move & CAPTURE or (move >> 12 & 15) % 6 == PAWN:
+                return clock
+            clock += 1
+        return self.start_halfmove_clock + clock
+
+    # starts a new game from an EPD record: the first four FEN fields followed by operations such as
+    # bm Qxf7+; id "WAC.001"; returns the operations as {opcode: [operands]}
+    def load_epd(self, epd):
+        fields = epd.split(None, 4)
+        if len(fields) < 4:
+            raise ValueError(f"EPD {epd!r} needs a placement, side to move, castling and en passant field")
+        operations = parse_epd_operations(fields[4] if len(fields) > 4 else "")
+        counters = [operations.get("hmvc", ["0"])[0], operations.get("fmvn", ["1"])[0]]
+        self.load_fen(" ".join(fields[:4] + counters))
+        return operations
+
+    # EPD record of the current position followed by operations ({opcode: [operands]})
+    def get_epd(self, operations=None):
+        record = " ".join(self.get_fen().split()[:4])
+        for opcode, operands in (operations or {}).items():
+            # operands that aren't a single word are quoted
+            words = [operand if operand and re.fullmatch(r'[^\s;"]+', operand) else f'"{operand}"' for operand in map(str, operands)]
+            record += " " + " ".join([opcode] + words) + ";"
+        return record
+
+    # board as a 2d array of piece strings; derived from the square map and only meant for drawing
+    @property
+    def board(self):
+        return [["**" if index == EMPTY else PIECES[index] for index in self.piece_on[r * 8:r * 8 + 8]] for r in range(8)]
+
+    # adds/removes the piece with index index on square sq (xor toggles the bit, so the same function does both)
+    # the zobrist key and evaluation totals are updated here too, which keeps them in step through make_move and
+    # undo_move
+    def toggle_piece(self, index, sq):
+        bit = 1 << sq
+        self.bitboards[index] ^= bit
+        self.occupancy[index // 6] ^= bit
+        self.zobrist_key ^= ZOBRIST_PIECES[index][sq]
+        if self.material_values is not None:
+            if self.bitboards[index] & bit: # the piece was added
+                self.material_score += self.material_values[index]
+                self.position_score += self.position_values[index][sq]
+            else:
+                self.material_score -= self.material_values[index]
+                self.position_score -= self.position_values[index][sq]
+
+    # installs evaluation tables: material_values[piece index] and position_values[piece index][square], counted
+    # from white's point of view (black pieces carry negative values)
+    # material_score and position_score then hold the sums over all pieces on the board and are kept up to date
+    # by every move, so evaluating a position doesn't need to look at the board
+    def set_score_tables(self, material_values, position_values):
+        self.material_values = material_values
+        self.position_values = position_values
+        self.material_score, self.position_score = self.compute_scores()
+
+    # (material, position) totals computed from scratch
+    def compute_scores(self):
+        material_score = 0
+        position_score = 0
+        if self.material_values is None:
+            return material_score, position_score
+        for index, bitboard in enumerate(self.bitboards):
+            while bitboard:
+                bit = bitboard & -bitboard
+                bitboard ^= bit
+                material_score += self.material_values[index]
+                position_score += self.position_values[index][bit.bit_length() - 1]
+        return material_score, position_score
+
+    def put_piece(self, index, sq):
+        self.toggle_piece(index, sq)
+        self.piece_on[sq] = index
+
+    def get_king_location(self, colour):
+        king = self.bitboards[PIECE_INDEX['wK' if colour == WHITE else 'bK']]
+        if not king:
+            return None
+        sq = king.bit_length() - 1
+        return (sq >> 3, sq & 7)
+
+    # independent copy of the game
+    # lets another thread search the position while this one keeps being played and drawn
+    def copy(self):
+        gs = GameState.__new__(GameState)
+        gs.__dict__.update(self.__dict__)
+        gs.move_log = self.move_log[:]
+        gs.key_history = self.key_history[:]
+        gs.bitboards = self.bitboards[:]
+        gs.occupancy = self.occupancy[:]
+        gs.piece_on = self.piece_on[:]
+        return gs
+
+    # zobrist key of the current position computed from scratch (make_move/undo_move keep self.zobrist_key updated)
+    def compute_zobrist_key(self):
+        key = 0 if self.white_to_move else ZOBRIST_BLACK_TO_MOVE
+        for index, bitboard in enumerate(self.bitboards):
+            while bitboard:
+                bit = bitboard & -bitboard
+                bitboard ^= bit
+                key ^= ZOBRIST_PIECES[index][bit.bit_length() - 1]
+        return key
+
+    # debug mode check that the incremental key and evaluation totals match a full recompute
+    def check_incremental_state(self, action):
+        expected = self.compute_zobrist_key()
+        if self.zobrist_key != expected:
+            raise RuntimeError("zobrist key %016x after %s, recomputed key is %016x" % (self.zobrist_key, action, expected))
+        expected = self.compute_scores()
+        if (self.material_score, self.position_score) != expected:
+            raise RuntimeError("material/position scores %s after %s, recomputed scores are %s"
+                               % ((self.material_score, self.position_score), action, expected))
+
+    # takes a packed move as parameter and executes it (doesn't work for castling and en-passant)
     def make_move(self, move):
-        self.board[move.start_row][move.start_col] = "**"
-        self.board[move.end_row][move.end_col] = move.piece_moved
+        start = move & 63
+        end = move >> 6 & 63
+        piece_moved = move >> 12 & 15
+        captured = (move >> 16 & 15) - 1
+        if captured != EMPTY:
+            self.toggle_piece(captured, end)
+        self.toggle_piece(piece_moved, start)
+        #checking for pawn promotion (only queen for now)
+        piece_placed = piece_moved + QUEEN - PAWN if move & PROMOTION else piece_moved
+        self.toggle_piece(piece_placed, end)
+        self.occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+        self.piece_on[start] = EMPTY
+        self.piece_on[end] = piece_placed
         self.move_log.append(move) # records move so it can be undone
         self.white_to_move = not self.white_to_move # swaps players
+        self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+        self.key_history.append(self.zobrist_key)
         #updating the king's location to check for checkmate
-        if move.piece_moved == 'wK':
-            self.white_king_location = (move.end_row, move.end_col)
-        elif move.piece_moved == 'bK':
-            self.black_king_location = (move.end_row), (move.end_col)
-        #checking for pawn promotion (only queen for now)
-        if move.is_pawn_promotion:
-            self.board[move.end_row][move.end_col] = move.piece_moved[0] + 'Q'
+        if piece_moved == KING:
+            self.white_king_location = (end >> 3, end & 7)
+        elif piece_moved == 6 + KING:
+            self.black_king_location = (end >> 3, end & 7)
+        if self.debug:
+            self.check_incremental_state("make_move " + Move(move).get_chess_notation())
 
     # undoes last move
     def undo_move(self):
         if len(self.move_log) != 0: #makes sure the move log isn't empty
             move = self.move_log.pop() #.pop() returns the last item in the list AND removes it
-            self.board[move.start_row][move.start_col] = move.piece_moved
-            self.board[move.end_row][move.end_col] = move.piece_captured
+            start = move & 63
+            end = move >> 6 & 63
+            piece_moved = move >> 12 & 15
+            captured = (move >> 16 & 15) - 1
+            piece_placed = piece_moved + QUEEN - PAWN if move & PROMOTION else piece_moved
+            self.toggle_piece(piece_placed, end)
+            self.toggle_piece(piece_moved, start)
+            if captured != EMPTY:
+                self.toggle_piece(captured, end)
+            self.occupied = self.occupancy[WHITE] | self.occupancy[BLACK]
+            self.piece_on[start] = piece_moved
+            self.piece_on[end] = captured
             self.white_to_move = not self.white_to_move #switch turns back
+            self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+            self.key_history.pop()
             # updating the king's location
-            if move.piece_moved == 'wK':
-                self.white_king_location = (move.start_row, move.start_col)
-            elif move.piece_moved == 'bK':
-                self.black_king_location = (move.start_row), (move.start_col)
-
-    # all moves considering checks (naive algorithm)
-    def get_valid_moves(self):
-        # generate all friendly moves (going backwards to prevent a bug)
-        moves = self.get_all_possible_moves()
-        for i in range(len(moves)-1, -1, -1):
-            self.make_move(moves[i]) # every make move fct switches turns so we need to switch it back
-            self.white_to_move = not self.white_to_move  # switch turn
-            if self.in_check(): # for each of enemy moves, see if friendly king is attacked
-                moves.remove(moves[i]) # if so, not a valid move
-            self.white_to_move = not self.white_to_move  # switch turn back
-            self.undo_move()
-        if len(moves) == 0:
-            if self.in_check():
-                self.check_mate = True
-            else:
-                self.stale_mate = True
-        else:
-            self.check_mate = False
-            self.stale_mate = False
+            if piece_moved == KING:
+                self.white_king_location = (start >> 3, start & 7)
+            elif piece_moved == 6 + KING:
+                self.black_king_location = (start >> 3, start & 7)
+            if self.debug:
+                self.check_incremental_state("undo_move " + Move(move).get_chess_notation())
+
+    # passes the turn without moving, for null move pruning in the search (there is no en passant or castling state to
+    # clear); it isn't recorded in the move log, so it has to be taken back with undo_null_move, not undo_move
+    def make_null_move(self):
+        self.white_to_move = not self.white_to_move
+        self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+        self.key_history.append(self.zobrist_key)
+
+    def undo_null_move(self):
+        self.white_to_move = not self.white_to_move
+        self.zobrist_key ^= ZOBRIST_BLACK_TO_MOVE
+        self.key_history.pop()
+
+    # all moves considering checks (a new list the caller may reorder), from the move cache when there is one
+    # captures_only=True keeps just the captures and pawn promotions (for quiescence search); it leaves the
+    # check_mate/stale_mate flags alone since an empty list doesn't end the game then
+    def get_valid_moves(self, captures_only=False):
+        if self.move_cache is not None and not captures_only:
+            return self.move_cache.get_valid_moves(self)
+        return self.generate_valid_moves(captures_only)
+
+    # get_valid_moves without the cache
+    # checkers and pinned pieces are worked out once for the position, so every generated move is already legal
+    def generate_valid_moves(self, captures_only=False):
+        us, them = (WHITE, BLACK) if self.white_to_move else (BLACK, WHITE)
+        friends = self.occupancy[us]
+        # squares the pieces may move to
+        allowed = self.occupancy[them] if captures_only else FULL_BOARD ^ friends
+        king = self.bitboards[us * 6 + KING]
+        king_sq = king.bit_length() - 1
+        checkers = self.attackers_to(king_sq, them, self.occupied)
+        moves = []
+        # the king is lifted off the board for the enemy attacks, otherwise it would hide the squares behind it from a
+        # checking slider
+        targets = KING_ATTACKS[king_sq] & allowed
+        if targets:
+            targets &= FULL_BOARD ^ self.attacked_squares(them, self.occupied ^ king)
+            self.add_moves_from(king_sq, us * 6 + KING, targets, moves)
+        if not checkers & (checkers - 1): # in double check only the king can move
+            target_mask = FULL_BOARD ^ friends
+            if checkers: # the checker has to be captured or the ray between it and the king blocked
+                target_mask &= checkers | BETWEEN[king_sq][checkers.bit_length() - 1]
+            pin_rays = self.get_pin_rays(king_sq, us, them)
+            # pawn pushes onto the last row are promotions, which count as captures for captures_only
+            pawn_mask = target_mask & (allowed | ROWS[0] | ROWS[7]) if captures_only else target_mask
+            target_mask &= allowed
+            self.get_pawn_moves(moves, pawn_mask, pin_rays)
+            self.get_rook_moves(moves, target_mask, pin_rays)
+            self.get_knight_moves(moves, target_mask, pin_rays)
+            self.get_bishop_moves(moves, target_mask, pin_rays)
+            self.get_queen_moves(moves, target_mask, pin_rays)
+        if not captures_only:
+            self.check_mate = len(moves) == 0 and checkers != 0
+            self.stale_mate = len(moves) == 0 and checkers == 0
         return moves
 
     # determines if current player is in check
@@ -88,188 +504,314 @@ class GameState():
 
     # determines if the enemy can attack the square r,c
     def under_attack(self,r,c):
-        self.white_to_move = not self.white_to_move # switch pov to generate opponent's moves
-        opponent_moves = self.get_all_possible_moves()
-        for move in opponent_moves:
-            if move.end_row == r and move.end_col == c: # if square is under attack
-                self.white_to_move = not self.white_to_move # switch pov back
-                return True
-        self.white_to_move = not self.white_to_move  # switch pov back
-        return False
+        return self.attackers_to(r * 8 + c, BLACK if self.white_to_move else WHITE, self.occupied) != 0
+
+    # bitboard of the pieces of colour by that attack square sq, looking outward from sq for each piece type
+    def attackers_to(self, sq, by, occupied):
+        offset = by * 6
+        bitboards = self.bitboards
+        attackers = KNIGHT_ATTACKS[sq] & bitboards[offset + KNIGHT]
+        attackers |= KING_ATTACKS[sq] & bitboards[offset + KING]
+        # a pawn attacks sq from the squares a pawn of the other colour on sq would attack
+        attackers |= PAWN_ATTACKS[by ^ 1][sq] & bitboards[offset + PAWN]
+        rooks = bitboards[offset + ROOK] | bitboards[offset + QUEEN]
+        if rooks:
+            attackers |= slider_attacks(sq, occupied, ROOK_RAYS) & rooks
+        bishops = bitboards[offset + BISHOP] | bitboards[offset + QUEEN]
+        if bishops:
+            attackers |= slider_attacks(sq, occupied, BISHOP_RAYS) & bishops
+        return attackers
+
+    # every square attacked by the pieces of colour by, looking up each of its pieces (pawns are shifted all at once),
+    # so the work shrinks with the material left on the board
+    def attacked_squares(self, by, occupied):
+        offset = by * 6
+        bitboards = self.bitboards
+        attacks = 0
+        pawns = bitboards[offset + PAWN]
+        if pawns:
+            dr = -1 if by == WHITE else 1
+            attacks = shift(pawns, dr, -1) | shift(pawns, dr, 1)
+        for piece, table, rays in ((KNIGHT, KNIGHT_ATTACKS, None), (BISHOP, None, BISHOP_RAYS), (ROOK, None, ROOK_RAYS),
+                                   (QUEEN, None, QUEEN_RAYS), (KING, KING_ATTACKS, None)):
+            pieces = bitboards[offset + piece]
+            while pieces:
+                bit = pieces & -pieces
+                pieces ^= bit
+                sq = bit.bit_length() - 1
+                attacks |= table[sq] if rays is None else slider_attacks(sq, occupied, rays)
+        return attacks
+
+    # maps every pinned piece of colour us to the ray it may still move along (up to and including the pinner)
+    def get_pin_rays(self, king_sq, us, them):
+        pin_rays = {}
+        offset = them * 6
+        queens = self.bitboards[offset + QUEEN]
+        occupied = self.occupied
+        for direction_rays, pinners in ((ROOK_RAYS, self.bitboards[offset + ROOK] | queens),
+                                        (BISHOP_RAYS, self.bitboards[offset + BISHOP] | queens)):
+            if not pinners:
+                continue
+            for rays, ascending in direction_rays:
+                ray = rays[king_sq]
+                if not ray & pinners:
+                    continue
+                # the first piece on the ray has to be ours and the second an enemy slider moving along this line
+                blockers = ray & occupied
+                first = (blockers & -blockers).bit_length() - 1 if ascending else blockers.bit_length() - 1
+                if not self.occupancy[us] >> first & 1:
+                    continue
+                blockers ^= 1 << first
+                if not blockers:
+                    continue
+                second = (blockers & -blockers).bit_length() - 1 if ascending else blockers.bit_length() - 1
+                if pinners >> second & 1:
+                    pin_rays[first] = ray ^ rays[second]
+        return pin_rays
 
     #all moves without considering checks
     def get_all_possible_moves(self):
         #all the moves will be added to this list
         moves = []
-        for r in range(len(self.board)):
-            for c in range(len(self.board[r])):
-                #accessing the first character of a given square on the board (b, w or *)
-                turn = self.board[r][c][0]
-                if (turn == 'w' and self.white_to_move) or (turn == 'b' and not self.white_to_move):
-                    #accessing piece type
-                    piece = self.board[r][c][1]
-                    if piece == 'p':
-                        self.get_pawn_moves(r, c, moves)
-                    elif piece == 'R':
-                        self.get_rook_moves(r, c, moves)
-                    elif piece == 'N':
-                        self.get_knight_moves(r, c, moves)
-                    elif piece == 'B':
-                        self.get_bishop_moves(r, c, moves)
-                    elif piece == 'Q':
-                        self.get_queen_moves(r, c, moves)
-                    elif piece == 'K':
-                        self.get_king_moves(r, c, moves)
+        target_mask = FULL_BOARD ^ self.get_sides()[0]
+        self.get_pawn_moves(moves, target_mask, {})
+        self.get_rook_moves(moves, target_mask, {})
+        self.get_knight_moves(moves, target_mask, {})
+        self.get_bishop_moves(moves, target_mask, {})
+        self.get_queen_moves(moves, target_mask, {})
+        self.get_king_moves(moves, target_mask)
         return moves
 
-    #get all possible moves for the pawn located at r and c and add them to the list
-    def get_pawn_moves(self, r, c, moves):
+    # bitboards of the side to move: (its pieces, enemy pieces, index of its pawn bitboard)
+    def get_sides(self):
+        if self.white_to_move:
+            return self.occupancy[WHITE], self.occupancy[BLACK], PIECE_INDEX['wp']
+        return self.occupancy[BLACK], self.occupancy[WHITE], PIECE_INDEX['bp']
+
+    # adds a pawn move for every target bit, the start square being the target minus a fixed offset
+    # (targets on the first or last row are promotions)
+    def add_moves_by_offset(self, targets, offset, moves):
+        piece_on = self.piece_on
+        pawn = (PIECE_INDEX['wp'] if self.white_to_move else PIECE_INDEX['bp']) << 12
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            end = bit.bit_length() - 1
+            move = (end - offset) | end << 6 | pawn | (piece_on[end] + 1) << 16
+            if bit & PROMOTION_ROWS:
+                move |= PROMOTION
+            moves.append(move)
+
+    # adds a move of the piece with index piece from the start square to every target bit
+    def add_moves_from(self, start, piece, targets, moves):
+        piece_on = self.piece_on
+        base = start | piece << 12
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            end = bit.bit_length() - 1
+            moves.append(base | end << 6 | (piece_on[end] + 1) << 16)
+
+    # get all possible moves for the pawns of the side to move that land on target_mask and add them to the list
+    # pinned pawns are generated one by one, restricted to their pin ray
+    def get_pawn_moves(self, moves, target_mask, pin_rays):
+        pawns = self.bitboards[self.get_sides()[2]]
+        for sq, ray in pin_rays.items():
+            if pawns >> sq & 1:
+                pawns ^= 1 << sq
+                self.add_pawn_moves(1 << sq, target_mask & ray, moves)
+        self.add_pawn_moves(pawns, target_mask, moves)
+
+    # adds the pushes and captures of a set of pawns at once
+    def add_pawn_moves(self, pawns, target_mask, moves):
+        enemies = self.get_sides()[1] & target_mask
+        empty = FULL_BOARD ^ self.occupied
         if self.white_to_move: #white to move
             #forward movements
-            if self.board[r-1][c] == "**": #1 square pawn advance
-                moves.append(Move((r,c),(r-1, c), self.board))
-                if r == 6 and self.board[r-2][c] == "**": #2 square pawn advance
-                    moves.append(Move((r,c),(r-2,c),self.board))
-            #diagonal movements
-            if 0 < c < 7: #if the piece isn't one of the edge pieces
-                if self.board[r-1][c-1][0] == 'b': #enemy piece to capture (black)
-                    moves.append(Move((r,c),(r-1,c-1),self.board))
-                if self.board[r-1][c+1][0] == 'b':
-                    moves.append(Move((r,c),(r-1,c+1),self.board))
-            if c == 0: #the leftmost piece
-                if self.board[r-1][c+1][0] == 'b':
-                    moves.append(Move((r,c),(r-1,c+1),self.board))
-            if c >= 7: #the rightmost piece
-                if self.board[r-1][c-1][0] == 'b':
-                    moves.append(Move((r,c),(r-1,c-1),self.board))
+            single = shift(pawns, -1, 0) & empty #1 square pawn advance
+            double = shift(single & ROWS[5], -1, 0) & empty #2 square pawn advance
+            self.add_moves_by_offset(single & target_mask, -8, moves)
+            self.add_moves_by_offset(double & target_mask, -16, moves)
+            #diagonal movements (enemy piece to capture)
+            self.add_moves_by_offset(shift(pawns, -1, -1) & enemies, -9, moves)
+            self.add_moves_by_offset(shift(pawns, -1, 1) & enemies, -7, moves)
         else: #black to move
             # forward movements
-            if self.board[r + 1][c] == "**":  # 1 square pawn advance
-                moves.append(Move((r, c), (r + 1, c), self.board))
-                if r == 1 and self.board[r + 2][c] == "**":  # 2 square pawn advance
-                    moves.append(Move((r, c), (r + 2, c), self.board))
+            single = shift(pawns, 1, 0) & empty
+            double = shift(single & ROWS[2], 1, 0) & empty
+            self.add_moves_by_offset(single & target_mask, 8, moves)
+            self.add_moves_by_offset(double & target_mask, 16, moves)
             # diagonal movements
-            if 0 < c < 7:  # if the piece isn't one of the edge pieces
-                if self.board[r + 1][c - 1][0] == 'w':  # enemy piece to capture (white)
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board))
-                if self.board[r + 1][c + 1][0] == 'w':
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board))
-            if c == 0:  # the leftmost piece
-                if self.board[r + 1][c + 1][0] == 'w':
-                    moves.append(Move((r, c), (r + 1, c + 1), self.board))
-            if c >= 7:  # the rightmost piece
-                if self.board[r + 1][c - 1][0] == 'w':
-                    moves.append(Move((r, c), (r + 1, c - 1), self.board))
-
-    # get all possible moves for the rook located at r and c and add them to the list
-    def get_rook_moves(self, r, c, moves):
-        if self.white_to_move:
-            friend = 'w'
-            enemy = 'b'
-        else:
-            friend = 'b'
-            enemy = 'w'
-
-        directions = ((-1, 0), (1, 0), (0, -1), (0, 1)) # top, bottom, left, right
-        for d in directions:
-            for i in range(1,8):
-                final_row = r + (i * d[0])
-                final_column = c + (i * d[1])
-                if 0 <= final_row <= 7 and 0 <= final_column <= 7:
-                    if self.board[final_row][final_column] == "**":  # empty square
-                        moves.append(Move((r, c), (final_row, final_column), self.board))
-                        continue
-                    elif self.board[final_row][final_column][0] == enemy:  # square occupied by enemy piece
-                        moves.append(Move((r, c), (final_row, final_column), self.board))
-                        break
-                    elif self.board[final_row][final_column][0] == friend:  # square occupied by friendly piece
-                        break
-
-
-    # get all possible moves for the knight located at r and c and add them to the list
-    def get_knight_moves(self, r, c, moves):
-        if self.white_to_move:
-            friend = 'w'
-            enemy = 'b'
-        else:
-            friend = 'b'
-            enemy = 'w'
-
-        directions = ((-2, -1), (-2, 1), (2, -1), (2, 1), (-1, -2), (1, -2), (-1, 2), (1, 2))  # top, bottom, left, right
-        for d in directions:
-                final_row = r + d[0]
-                final_column = c + d[1]
-                if 0 <= final_row <= 7 and 0 <= final_column <= 7:
-                    if self.board[final_row][final_column] == "**" or self.board[final_row][final_column][0] == enemy:  # empty or enemy occupied square
-                        moves.append(Move((r, c), (final_row, final_column), self.board))
-                    elif self.board[final_row][final_column][0] == friend:  # square occupied by friendly piece
-                        continue
-
-    # get all possible moves for the bishop located at r and c and add them to the list
-    def get_bishop_moves(self, r, c, moves):
-        if self.white_to_move:
-            friend = 'w'
-            enemy = 'b'
-        else:
-            friend = 'b'
-            enemy = 'w'
-
-        directions = ((-1, -1), (-1, 1), (1, -1), (1, 1)) # top-left, top-right, bottom-left, bottom-right
-        for d in directions:
-            for i in range(1,8):
-                final_row = r + (i * d[0])
-                final_column = c + (i * d[1])
-                if 0 <= final_row <= 7 and 0 <= final_column <= 7:
-                    if self.board[final_row][final_column] == "**":  # empty square
-                        moves.append(Move((r, c), (final_row, final_column), self.board))
-                        continue
-                    elif self.board[final_row][final_column][0] == enemy:  # square occupied by enemy piece
-                        moves.append(Move((r, c), (final_row, final_column), self.board))
-                        break
-                    elif self.board[final_row][final_column][0] == friend:  # square occupied by friendly piece
-                        break
-
-    # get all possible moves for the king located at r and c and add them to the list
-    def get_king_moves(self, r, c, moves):
-        if self.white_to_move:
-            friend = 'w'
-            enemy = 'b'
-        else:
-            friend = 'b'
-            enemy = 'w'
-
-        directions = ((-1, -1), (-1, 0), (-1, 1), (0, 1), (0, -1), (1, -1), (1, 0), (1, 1))  # top, bottom, left, right
-        for d in directions:
-                final_row = r + d[0]
-                final_column = c + d[1]
-                if 0 <= final_row <= 7 and 0 <= final_column <= 7:
-                    if self.board[final_row][final_column] == "**" or self.board[final_row][final_column][0] == enemy:  # empty or enemy occupied square
-                        moves.append(Move((r, c), (final_row, final_column), self.board))
-                    elif self.board[final_row][final_column][0] == friend:  # square occupied by friendly piece
-                        continue
-
-    # get all possible moves for the queen located at r and c and add them to the list
-    def get_queen_moves(self, r, c, moves):
-        self.get_rook_moves(r,c,moves)
-        self.get_bishop_moves(r, c, moves)
+            self.add_moves_by_offset(shift(pawns, 1, -1) & enemies, 7, moves)
+            self.add_moves_by_offset(shift(pawns, 1, 1) & enemies, 9, moves)
+
+    # adds the moves of every piece with index piece, attacks(sq) giving the squares one on sq reaches
+    def get_piece_moves(self, piece, attacks, target_mask, pin_rays, moves):
+        pieces = self.bitboards[piece]
+        while pieces:
+            bit = pieces & -pieces
+            pieces ^= bit
+            start = bit.bit_length() - 1
+            targets = attacks(start) & target_mask
+            if start in pin_rays:
+                targets &= pin_rays[start]
+            self.add_moves_from(start, piece, targets, moves)
+
+    # get all possible moves for the rooks of the side to move and add them to the list
+    def get_rook_moves(self, moves, target_mask, pin_rays):
+        rook = PIECE_INDEX['wR' if self.white_to_move else 'bR']
+        self.get_piece_moves(rook, lambda sq: slider_attacks(sq, self.occupied, ROOK_RAYS), target_mask, pin_rays, moves)
+
+    # get all possible moves for the knights of the side to move and add them to the list
+    def get_knight_moves(self, moves, target_mask, pin_rays):
+        knight = PIECE_INDEX['wN' if self.white_to_move else 'bN']
+        self.get_piece_moves(knight, KNIGHT_ATTACKS.__getitem__, target_mask, pin_rays, moves)
 
+    # get all possible moves for the bishops of the side to move and add them to the list
+    def get_bishop_moves(self, moves, target_mask, pin_rays):
+        bishop = PIECE_INDEX['wB' if self.white_to_move else 'bB']
+        self.get_piece_moves(bishop, lambda sq: slider_attacks(sq, self.occupied, BISHOP_RAYS), target_mask, pin_rays, moves)
+
+    # get all possible moves for the king of the side to move and add them to the list (without checking the
+    # target squares for attacks, get_valid_moves does that)
+    def get_king_moves(self, moves, target_mask):
+        king = PIECE_INDEX['wK' if self.white_to_move else 'bK']
+        self.get_piece_moves(king, KING_ATTACKS.__getitem__, target_mask, {}, moves)
+
+    # get all possible moves for the queens of the side to move and add them to the list
+    def get_queen_moves(self, moves, target_mask, pin_rays):
+        queen = PIECE_INDEX['wQ' if self.white_to_move else 'bQ']
+        self.get_piece_moves(queen, lambda sq: slider_attacks(sq, self.occupied, QUEEN_RAYS), target_mask, pin_rays, moves)
+
+# LRU cache of legal move lists keyed by zobrist key, holding at most max_entries positions
+# the GUI and the AI can share one: the GUI asks for the moves of the same position every frame, and the search keeps
+# expanding positions it has already seen in an earlier iteration or through a transposition
+# every entry also gets an index of its moves by start square, built the first time it is asked for, so finding the
+# move of a click or the targets of a selected piece is a dictionary lookup
+class MoveCache():
+
+    def __init__(self, max_entries=50000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict() # key: [moves, check_mate flag, moves by start square or None]
+        self.lock = threading.Lock() # a background search and the GUI may use the cache at the same time
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    # the cache entry for gs, generating its moves on a miss; sets gs's check_mate/stale_mate flags like
+    # get_valid_moves does
+    def lookup(self, gs):
+        key = gs.zobrist_key
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.hits += 1
+                self.entries.move_to_end(key)
+        if entry is None:
+            self.misses += 1
+            moves = gs.generate_valid_moves()
+            entry = [tuple(moves), gs.check_mate, None]
+            with self.lock:
+                self.entries[key] = entry
+                if len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+                    self.evictions += 1
+        gs.check_mate = entry[1]
+        gs.stale_mate = not entry[0] and not entry[1]
+        return entry
+
+    def get_valid_moves(self, gs):
+        return list(self.lookup(gs)[0])
+
+    # legal moves of the piece on (row, col) of gs
+    def moves_from(self, gs, row, col):
+        entry = self.lookup(gs)
+        if entry[2] is None:
+            by_start = {}
+            for move in entry[0]:
+                by_start.setdefault(move & 63, []).append(move)
+            entry[2] = by_start
+        return entry[2].get(row * 8 + col, [])
+
+    # the legal move of gs from start_square to end_square ((row, col) pairs), or None if there is none
+    def find_move(self, gs, start_square, end_square):
+        end = end_square[0] * 8 + end_square[1]
+        for move in self.moves_from(gs, start_square[0], start_square[1]):
+            if move >> 6 & 63 == end:
+                return move
+        return None
+
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def get_stats(self):
+        return {"entries": len(self.entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses, "hit_rate": self.hit_rate(), "evictions": self.evictions}
+
+
+# thin wrapper around a packed move for the GUI and notation; the engine and the AI work on the packed ints
 class Move():
 
-    # passing the board as a parameter so the info about piece moves can be stored (easier to undo moves)
-    def __init__(self, start_square, end_square, board):
-        self.start_row = start_square[0]
-        self.start_col = start_square[1]
-        self.end_row = end_square[0]
-        self.end_col = end_square[1]
-        self.piece_moved = board[self.start_row][self.start_col]
-        self.piece_captured = board[self.end_row][self.end_col]
-        self.is_pawn_promotion = False
-        if (self.piece_moved == 'wp' and self.end_row == 0) or (self.piece_moved == 'bp' and self.end_row == 7):
-            self.is_pawn_promotion = True
-        #giving a unique move id parameter that is going to be used for comparison (similar to a hash code)
-        #the move id will be a unique value from 0-7777
-        self.move_id = self.start_row * 1000 + self.start_col * 100 + self.end_row * 10 + self.end_col
+    __slots__ = ('code',)
+
+    def __init__(self, code):
+        self.code = code
+
+    # the move a player makes by dragging the piece on start_square (row, col) of board to end_square
+    @classmethod
+    def from_squares(cls, start_square, end_square, board):
+        start = start_square[0] * 8 + start_square[1]
+        end = end_square[0] * 8 + end_square[1]
+        piece_moved = board[start_square[0]][start_square[1]]
+        captured = board[end_square[0]][end_square[1]]
+        code = start | end << 6 | (0 if captured == "**" else PIECE_INDEX[captured] + 1) << 16
+        if piece_moved != "**":
+            code |= PIECE_INDEX[piece_moved] << 12
+            if piece_moved[1] == 'p' and end_square[0] in (0, 7):
+                code |= PROMOTION
+        return cls(code)
+
+    @property
+    def start_row(self):
+        return (self.code & 63) >> 3
+
+    @property
+    def start_col(self):
+        return self.code & 7
 
+    @property
+    def end_row(self):
+        return (self.code >> 6 & 63) >> 3
+
+    @property
+    def end_col(self):
+        return self.code >> 6 & 7
+
+    @property
+    def piece_moved(self):
+        return PIECES[self.code >> 12 & 15]
+
+    @property
+    def piece_captured(self):
+        captured = self.code >> 16 & 15
+        return PIECES[captured - 1] if captured else "**"
+
+    @property
+    def is_pawn_promotion(self):
+        return bool(self.code & PROMOTION)
+
+    # unique within a position (start and end square), so moves made from clicks compare equal to generated ones
+    @property
+    def move_id(self):
+        return self.code & MOVE_SQUARES
 
     #overrides equals method for comparing moves
     def __eq__(self, other):
@@ -277,6 +819,9 @@ class Move():
            return self.move_id == other.move_id
         return False
 
+    def __hash__(self):
+        return self.move_id
+
     # translating the 2d array to ranks and files (chess notation) using dictionaries
     ranks_to_rows = {"1": 7, "2": 6, "3": 5, "4": 4,
                      "5": 3, "6": 2, "7": 1, "8": 0}
@@ -292,4 +837,4 @@ class Move():
 
     # returns rank-file notation for a single square on the board
     def get_rank_file(self, row, col):
-        return self.cols_to_files[col] + self.rows_to_ranks[row]
\ No newline at end of file
+        return self.cols_to_files[col] + self.rows_to_ranks[row]
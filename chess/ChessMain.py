@@ -1,45 +1,63 @@
 # User input & game state
 from chess import ChessEngine
 from chess import ChessAI
+from chess import book
+from chess import tablebase
+import os
 import pygame as p
 
-# Initializing pygame
-p.init()
-
 # Setting global variables
 WIDTH = HEIGHT = 512 #could do 400 too but 512 is a power of 8 so it works well for square size
 DIMENSION = 8 #8x8 chess board
 SQUARE_SIZE = HEIGHT // DIMENSION
 MAX_FPS = 15 #for animations
+AI_TIME_LIMIT = 5 # seconds the medium/hard AI may think about a move (it plays the deepest fully searched move)
+MOVE_CACHE_ENTRIES = 50000 # positions whose legal moves are kept
+PRINT_SEARCH_STATS = False # prints the search statistics (nodes per ply, cutoffs, timings, pv) of every AI move
+# piece images, next to this file so the game starts from any working directory
+IMAGE_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
 IMAGES = {} # Declaring a dictionary of images
 
 
-# Initializes a global dictionary of images, will be called ONLY ONCE in main
+# Initializes a global dictionary of images, called by main once the display exists (decoding and scaling the PNGs
+# is left out of the import); later calls keep the images already loaded
 # Setting this outside of main makes the program more flexible (in case for example we want to use different sets of pieces
 def load_images():
+    if IMAGES:
+        return
 
     # Loading every piece image into the dictionary
     # "IMAGES['wK'] will return the wK.png image
     pieces = ['bR', 'bN', 'bB', 'bQ', 'bK', 'bp', 'wR', 'wN', 'wB', 'wQ', 'wK', 'wp']
     for piece in pieces:
         # transform.scale scales the image, so it takes up the whole square
-        IMAGES[piece] = p.transform.scale(p.image.load("images/" + piece + ".png"), (SQUARE_SIZE,SQUARE_SIZE))
+        IMAGES[piece] = p.transform.scale(p.image.load(os.path.join(IMAGE_DIRECTORY, piece + ".png")), (SQUARE_SIZE,SQUARE_SIZE))
 
 
 def main():
 
+    # Initializing pygame (here rather than at import, so importing this module stays cheap)
+    p.init()
     # Setting screen variable
     screen = p.display.set_mode((WIDTH, HEIGHT))
     clock = p.time.Clock()
     screen.fill(p.Color("white"))
-    game_state = ChessEngine.GameState()
-    ai = ChessAI.AI()
+    # legal moves of the positions played, shared by the board (clicks and highlights), the game and the ai's searches
+    move_cache = ChessEngine.MoveCache(MOVE_CACHE_ENTRIES)
+    game_state = ChessEngine.GameState(move_cache=move_cache)
+    # opening book the medium/hard AI plays from before it starts searching (built with python -m chess.book build)
+    opening_book = book.OpeningBook(book.DEFAULT_PATH) if os.path.exists(book.DEFAULT_PATH) else None
+    # endgame tables (python -m chess.tablebase build), so the ai plays the endings they cover perfectly
+    tablebases = tablebase.Tablebases()
+    ai = ChessAI.AI(book=opening_book, tablebases=tablebases, stats=ChessAI.SearchStats() if PRINT_SEARCH_STATS else None)
+    search = ChessAI.BackgroundSearch(ai) # runs the medium/hard AI's searches (and pondering) off the event loop
 
     # storing valid moves in the current game state in a list
     valid_moves = game_state.get_valid_moves()
     # flag variable for when a move is made (to make sure the valid moves are only checked AFTER the usesr played a valid move, and not after any move the user makes)
     move_made = False
     load_images()
+    renderer = BoardRenderer(screen)
     # tuple (row,col) that will store the location of the selected square (empty for now)
     sq_selected = ()
     # list that keeps track of player clicks (using two tuples for 1st and 2nd click coordinates : [(6,4), (5,4)])
@@ -50,7 +68,7 @@ def main():
     player_ai = False # true if human is playing black and ai is playing white
     easy_ai = False # random move ai
     medium_ai = False # minimax with simple eval fct + depth of 1
-    hard_ai = False # minimax with complex eval fct + depth of 2
+    hard_ai = False # search with complex eval fct + depth of 5 (as deep as AI_TIME_LIMIT allows)
     depth = 0 # number of branching in search tree
     difficulty = 0 # medium_ai = 1, hard_ai = 2
 
@@ -61,7 +79,11 @@ def main():
 
         for e in p.event.get():
             if e.type == p.QUIT:
+                search.cancel()
                 running = False
+            # the window was uncovered or restored: its contents may be gone, draw everything again
+            elif e.type in (p.VIDEOEXPOSE, p.WINDOWEXPOSED):
+                renderer.invalidate()
             # mouse handler
             elif e.type == p.MOUSEBUTTONDOWN:
                 if not human_vs_cpu or (human_vs_cpu and is_human_turn):
@@ -80,24 +102,26 @@ def main():
                             player_clicks.append(sq_selected) # add both first and second clicks
 
                         if len(player_clicks) == 2: # if its the player's 2nd click, we need to move the piece
-                            move = ChessEngine.Move(player_clicks[0], player_clicks[1], game_state.board)
+                            move = ChessEngine.Move.from_squares(player_clicks[0], player_clicks[1], game_state.board)
                             print(move.get_chess_notation())
-                            for i in range(len(valid_moves)): # iterating through the valid moves to see if player's move is in it
-                                if move == valid_moves[i]:
-                                    game_state.make_move(valid_moves[i])
-                                    move_made = True
-                                    sq_selected = ()  # reset user clicks
-                                    player_clicks = []
+                            valid_move = move_cache.find_move(game_state, player_clicks[0], player_clicks[1]) # looking the player's move up among the valid moves
+                            if valid_move is not None:
+                                game_state.make_move(valid_move)
+                                move_made = True
+                                sq_selected = ()  # reset user clicks
+                                player_clicks = []
                             if not move_made:
                                 player_clicks = [sq_selected]
             # key handlers
             elif e.type == p.KEYDOWN:
                 if e.key == p.K_e: # press c to play vs easy ai
+                    search.cancel()
                     human_vs_cpu = True
                     easy_ai = True
                     medium_ai = False
                     hard_ai = False
                 if e.key == p.K_m: # press c to play vs medium ai
+                    search.cancel()
                     human_vs_cpu = True
                     easy_ai = False
                     medium_ai = True
@@ -105,17 +129,20 @@ def main():
                     depth = 1
                     difficulty = 1
                 if e.key == p.K_h: # press c to play vs hard ai
+                    search.cancel()
                     human_vs_cpu = True
                     easy_ai = False
                     medium_ai = False
                     hard_ai = True
-                    depth = 2
+                    depth = 5
                     difficulty = 2
-                if e.key == p.K_z: # undo when 'z' is pressed
+                if e.key == p.K_z: # undo when 'z' is pressed (also takes back the ai's turn while it is thinking)
+                    search.cancel()
                     game_state.undo_move()
                     move_made = True
                 if e.key == p.K_r: # reset the board when r is pressed (resetting variable)
-                    game_state = ChessEngine.GameState()
+                    search.cancel()
+                    game_state = ChessEngine.GameState(move_cache=move_cache)
                     valid_moves = game_state.get_valid_moves()
                     sq_selected = ()
                     player_clicks = []
@@ -127,77 +154,140 @@ def main():
             if easy_ai:
                 ai_easy_move = ai.generate_random_move(valid_moves)
                 game_state.make_move(ai_easy_move)
-                print(ai_easy_move.get_chess_notation())
-            # smart move generator [difficulty = 1] (minimax w/ depth = 1 & simple evaluation fct)
-            if medium_ai:
-                ai_medium_move = ai.generate_smart_move(game_state, depth, difficulty)
-                game_state.make_move(ai_medium_move)
-                print(ai_medium_move.get_chess_notation())
-            # smart move generator [difficulty = 2] (minimax w/ depth = 2 & complex evaluation fct)
-            if hard_ai:
-                ai_hard_move = ai.generate_smart_move(game_state, depth, difficulty)
-                game_state.make_move(ai_hard_move)
-                print(ai_hard_move.get_chess_notation())
-            move_made = True
+                print(ChessEngine.Move(ai_easy_move).get_chess_notation())
+                move_made = True
+            # smart move generators [difficulty = 1] (minimax w/ depth = 1 & simple evaluation fct)
+            # and [difficulty = 2] (search w/ depth = 5 & complex evaluation fct, within AI_TIME_LIMIT)
+            # the search runs in a background thread and is polled once per frame, so the window keeps responding
+            if medium_ai or hard_ai:
+                # keep the ponder search if the human played the reply it expected, otherwise start over
+                if search.pondering and not search.ponder_hit(game_state, AI_TIME_LIMIT):
+                    search.cancel()
+                if not search.is_running():
+                    search.start(game_state, depth, difficulty, AI_TIME_LIMIT)
+                ai_smart_move = search.poll()
+                if ai_smart_move is not None:
+                    game_state.make_move(ai_smart_move)
+                    print(ChessEngine.Move(ai_smart_move).get_chess_notation())
+                    if ai.stats is not None:
+                        print(ai.stats.format())
+                    move_made = True
+                    # ponder on the reply the search expects while the human thinks
+                    expected_reply = ai.get_pv(game_state, 1)
+                    if expected_reply:
+                        search.start(game_state, depth, difficulty, ponder_move=expected_reply[0])
 
 
         if move_made:
             valid_moves = game_state.get_valid_moves()
             move_made = False
-        draw_game_state(screen, game_state, valid_moves, sq_selected)
 
         # declaring and printing check/stalemate
+        text = None
         if game_state.check_mate:
             game_over = True
             if game_state.white_to_move:
-                draw_text(screen, "CHECKMATE - BLACK WINS")
+                text = "CHECKMATE - BLACK WINS"
             else:
-                draw_text(screen, "CHECKMATE - WHITE WINS")
+                text = "CHECKMATE - WHITE WINS"
         elif game_state.stale_mate:
             game_over = True
-            draw_text(screen, "STALEMATE - DRAW")
+            text = "STALEMATE - DRAW"
+        # only the squares that changed are repainted and sent to the display
+        dirty = renderer.draw(game_state, sq_selected, text)
 
         clock.tick(MAX_FPS)
-        p.display.flip()
+        if dirty:
+            p.display.update(dirty)
+    if opening_book is not None:
+        opening_book.close()
+    tablebases.close()
     p.quit()
 
-#highlights square selected and moves for piece selected
-def highlight_square(screen, game_state, valid_moves, square_selected):
-    if square_selected != ():
-        r, c = square_selected
-        if game_state.board[r][c][0] == ('w' if game_state.white_to_move else 'b'): #if its white's turn to move, set gs.board[r][c][0] to 'w', otherwise set it to 'b'
-            #highlight selected square
-            s = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
-            s.set_alpha(100) #the higher the value is (0-255), the more opaque
-            s.fill(p.Color('gray'))
-            screen.blit(s, (c*SQUARE_SIZE, r*SQUARE_SIZE))
-
-            #draw circle on valid moves squares
-            s.fill(p.Color('yellow'))
-            for move in valid_moves:
-                if move.start_row == r and move.start_col == c:
-                    if game_state.board[move.end_row][move.end_col][0] == ('b' if game_state.white_to_move else 'w'): #if the square has an enemy piece
-                        screen.blit(s, (move.end_col * SQUARE_SIZE, move.end_row * SQUARE_SIZE))
-                    else: #if the square is empty
-                        p.draw.circle(screen,'yellow', ((move.end_col * SQUARE_SIZE + 33), (move.end_row * SQUARE_SIZE + 33)), 10)
-
-#end game text
-def draw_text(screen, text):
-    font = p.font.SysFont("consolas", 35, True, False)
-    text_item = font.render(text, True, p.Color('Dark Green'))
+# draws the board incrementally: remembers what every square showed on the last frame and repaints only the squares
+# whose piece or highlight changed since, so an idle frame costs next to nothing (the rects of the repainted squares
+# are returned for display.update)
+# the empty board, the highlight squares and the font are rendered once and reused
+class BoardRenderer():
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.board_surface = draw_board(p.Surface((WIDTH, HEIGHT)))
+        self.selected_surface = highlight_surface('gray')
+        self.capture_surface = highlight_surface('yellow')
+        self.font = p.font.SysFont("consolas", 35, True, False)
+        self.text_surfaces = {} # end game texts rendered so far
+        self.drawn = [None] * (DIMENSION * DIMENSION) # (piece, mark) each square shows, None when it must be repainted
+        self.drawn_text = None
+
+    # makes the next draw repaint every square (after the window was uncovered, for instance)
+    def invalidate(self):
+        self.drawn = [None] * (DIMENSION * DIMENSION)
+
+    # what every square should show: (piece, mark), the mark being "" or one of the highlights of the selected
+    # piece ("selected" on its square, "capture" or "move" on the squares it can go to)
+    def square_states(self, game_state, square_selected):
+        board = game_state.board
+        marks = [""] * (DIMENSION * DIMENSION)
+        if square_selected != ():
+            r, c = square_selected
+            if board[r][c][0] == ('w' if game_state.white_to_move else 'b'): # only the pieces of the side to move are highlighted
+                marks[r * DIMENSION + c] = "selected"
+                enemy = 'b' if game_state.white_to_move else 'w'
+                for move in map(ChessEngine.Move, game_state.move_cache.moves_from(game_state, r, c)):
+                    marks[move.end_row * DIMENSION + move.end_col] = "capture" if board[move.end_row][move.end_col][0] == enemy else "move"
+        return [(board[sq // DIMENSION][sq % DIMENSION], marks[sq]) for sq in range(DIMENSION * DIMENSION)]
+
+    # brings the screen up to date with game_state (and the end game text, if any); returns the rects that changed
+    def draw(self, game_state, square_selected, text=None):
+        if text != self.drawn_text:
+            self.invalidate() # the text lies over several squares, the whole board is drawn again under it
+        dirty = []
+        for sq, state in enumerate(self.square_states(game_state, square_selected)):
+            if state != self.drawn[sq]:
+                dirty.append(self.draw_square(sq, *state))
+                self.drawn[sq] = state
+        if text != self.drawn_text:
+            if text is not None:
+                draw_text(self.screen, self.render_text(text))
+            self.drawn_text = text
+        return dirty
+
+    def draw_square(self, sq, piece, mark):
+        row, column = divmod(sq, DIMENSION)
+        rect = p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE)
+        self.screen.blit(self.board_surface, rect, rect)
+        if mark == "selected":
+            self.screen.blit(self.selected_surface, rect)
+        elif mark == "capture":
+            self.screen.blit(self.capture_surface, rect)
+        elif mark == "move":
+            p.draw.circle(self.screen, 'yellow', ((column * SQUARE_SIZE + 33), (row * SQUARE_SIZE + 33)), 10)
+        if piece != "**": #if the square isn't empty
+            self.screen.blit(IMAGES[piece], rect)
+        return rect
+
+    def render_text(self, text):
+        if text not in self.text_surfaces:
+            self.text_surfaces[text] = self.font.render(text, True, p.Color('Dark Green'))
+        return self.text_surfaces[text]
+
+
+# translucent square laid over the highlighted squares
+def highlight_surface(color):
+    s = p.Surface((SQUARE_SIZE, SQUARE_SIZE))
+    s.set_alpha(100) #the higher the value is (0-255), the more opaque
+    s.fill(p.Color(color))
+    return s
+
+#end game text (text_item is the rendered text)
+def draw_text(screen, text_item):
     text_location = p.Rect(0,0,WIDTH,HEIGHT).move(WIDTH/2 - text_item.get_width()/2, HEIGHT/2.5 - text_item.get_height()/2.5)
     screen.blit(text_item, text_location)
 
-#handles all graphics in the current game state
-def draw_game_state(screen, game_state, valid_moves, sq_selected):
-    draw_board(screen)
-    highlight_square(screen, game_state, valid_moves, sq_selected)
-    draw_pieces(screen, game_state.board)
-
-
 
-#draws squares on the board (before drawing the pieces)
-def draw_board(screen):
+#draws squares on the board (before drawing the pieces) onto surface, which is returned
+def draw_board(surface):
     # due to the n*n structure of the board and the fact that the top left square is always light then when row+column/2 is even, its a white square
     #creating a list of two colors so its indices can be used to determine position of square on the board
     colors = [p.Color("white"), p.Color("lavender")]
@@ -205,17 +295,8 @@ def draw_board(screen):
     for row in range(DIMENSION):
         for column in range(DIMENSION):
             color = colors[((row + column) % 2)]
-            p.draw.rect(screen, color, p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
-
-
-#draws pieces on top of squares
-# doing this as a separate function in case highlighting squares is added
-def draw_pieces(screen, board):
-    for row in range(DIMENSION):
-        for column in range(DIMENSION):
-            piece = board[row][column]
-            if piece != "**": #if the square isn't empty
-                screen.blit(IMAGES[piece], p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+            p.draw.rect(surface, color, p.Rect(column*SQUARE_SIZE, row*SQUARE_SIZE, SQUARE_SIZE, SQUARE_SIZE))
+    return surface
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+# Opening book: a sorted file of 16-byte entries in the Polyglot layout (big-endian key, move, weight, learn), opened
+# with mmap and binary searched, so it costs neither load time nor memory however big it is
+# the keys are this engine's zobrist keys (not the Polyglot random table), so books have to be built with build_book
+# run from the repository root:
+#   python -m chess.book build GAMES.pgn [GAMES.pgn ...] -o BOOK [--max-ply N]   compiles a book from PGN files
+#   python -m chess.book show BOOK [--fen FEN]                                   lists the book moves of a position
+
+import argparse
+import mmap
+import os
+import random
+import struct
+
+from chess import ChessEngine
+from chess.pgn import read_pgn, parse_san
+
+ENTRY = struct.Struct(">QHHI") # key, move, weight, learn
+DEFAULT_MAX_PLY = 24 # moves deeper into a game than this are left out of the book
+# the book the game, the UCI engine and self-play open when it exists (built from openings.pgn next to it)
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "openings.bin")
+# Polyglot promotion piece codes
+PROMOTION_QUEEN = 4
+
+
+# Polyglot move: to file | to rank << 3 | from file << 6 | from rank << 9 | promotion << 12, ranks counted from
+# white's side
+def encode_move(move):
+    start = move & 63
+    end = move >> 6 & 63
+    encoded = (end & 7) | (7 - (end >> 3)) << 3 | (start & 7) << 6 | (7 - (start >> 3)) << 9
+    if move & ChessEngine.PROMOTION:
+        encoded |= PROMOTION_QUEEN << 12
+    return encoded
+
+
+# the legal move of gs a Polyglot move stands for (None if it isn't one)
+def decode_move(gs, encoded):
+    start = (7 - (encoded >> 9 & 7)) * 8 + (encoded >> 6 & 7)
+    end = (7 - (encoded >> 3 & 7)) * 8 + (encoded & 7)
+    for move in gs.get_valid_moves():
+        if move & 63 == start and move >> 6 & 63 == end:
+            return move
+    return None
+
+
+class OpeningBook():
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "rb")
+        size = os.fstat(self.file.fileno()).st_size
+        self.entries = size // ENTRY.size
+        # mmap can't map an empty file, and an empty book has nothing to read anyway
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+
+    def __len__(self):
+        return self.entries
+
+    # index of the first entry whose key is >= key
+    def find(self, key):
+        low, high = 0, self.entries
+        while low < high:
+            middle = (low + high) // 2
+            if struct.unpack_from(">Q", self.data, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    # (Polyglot move, weight) of every entry for key
+    def get_entries(self, key):
+        entries = []
+        i = self.find(key)
+        while i < self.entries:
+            entry_key, move, weight, _ = ENTRY.unpack_from(self.data, i * ENTRY.size)
+            if entry_key != key:
+                break
+            entries.append((move, weight))
+            i += 1
+        return entries
+
+    # (move, weight) for the book moves of gs that are legal there
+    def get_moves(self, gs):
+        moves = []
+        for encoded, weight in self.get_entries(gs.zobrist_key):
+            move = decode_move(gs, encoded)
+            if move is not None:
+                moves.append((move, weight))
+        return moves
+
+    # a book move for gs picked at random in proportion to the weights, or None when the position isn't in the book
+    def choose_move(self, gs, rng=random):
+        moves = [(move, weight) for move, weight in self.get_moves(gs) if weight > 0]
+        if not moves:
+            return None
+        return rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+    def close(self):
+        if self.entries:
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+# compiles the games of the PGN files into a book at book_path, following each game for at most max_ply moves
+# (until a move this engine can't play); a move scores 2 for every game its side won and 1 for every draw or
+# game without a result, like Polyglot books
+# returns (games read, positions written, games cut short by a move that couldn't be read)
+def build_book(pgn_paths, book_path, max_ply=DEFAULT_MAX_PLY):
+    weights = {}
+    games = unreadable = 0
+    for path in pgn_paths:
+        for tags, sans in read_pgn(path):
+            games += 1
+            gs = ChessEngine.GameState()
+            if "FEN" in tags:
+                gs.load_fen(tags["FEN"])
+            result = tags.get("Result", "*")
+            for san in sans[:max_ply]:
+                move = parse_san(gs, san)
+                if move is None:
+                    unreadable += not san.startswith(("O-O", "0-0"))
+                    break
+                won = result == ("1-0" if gs.white_to_move else "0-1")
+                lost = result == ("0-1" if gs.white_to_move else "1-0")
+                if not lost:
+                    entry = (gs.zobrist_key, encode_move(move))
+                    weights[entry] = weights.get(entry, 0) + (2 if won else 1)
+                gs.make_move(move)
+    # weights are 16 bits, so big collections get scaled down
+    scale = max(1, (max(weights.values(), default=0) + 65534) // 65535)
+    with open(book_path, "wb") as book:
+        for (key, move), weight in sorted(weights.items()):
+            book.write(ENTRY.pack(key, move, max(1, weight // scale), 0))
+    return games, len({key for key, _ in weights}), unreadable
+
+
+def main():
+    parser = argparse.ArgumentParser(description="opening book builder and viewer")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile PGN files into a book")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("-o", "--output", required=True)
+    build.add_argument("--max-ply", type=int, default=DEFAULT_MAX_PLY)
+    show = commands.add_parser("show", help="list the book moves of a position")
+    show.add_argument("book")
+    show.add_argument("--fen", help="position to look up (the starting position by default)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        games, positions, unreadable = build_book(args.pgn, args.output, args.max_ply)
+        print(f"{games} games, {positions} positions written to {args.output}"
+              + (f", {unreadable} games stopped at a move that couldn't be read" if unreadable else ""))
+        return
+    gs = ChessEngine.GameState()
+    if args.fen:
+        gs.load_fen(args.fen)
+    with OpeningBook(args.book) as book:
+        moves = book.get_moves(gs)
+        total = sum(weight for _, weight in moves)
+        for move, weight in sorted(moves, key=lambda item: -item[1]):
+            print(f"{ChessEngine.Move(move).get_chess_notation()} weight {weight} ({weight / total:.0%})")
+        if not moves:
+            print("position not in the book")
+
+
+if __name__ == "__main__":
+    main()
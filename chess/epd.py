@@ -0,0 +1,119 @@
+# Bulk analysis of EPD files: searches every position of the file with the AI under a depth and/or time limit and
+# writes one JSON line per position as soon as it is done, so files of any size stream through
+# positions with a bm (best move) or am (avoid move) operation are scored like a test suite: solved when the AI plays
+# one of the best moves, or none of the avoided ones
+# records that don't load (a broken FEN, an impossible position) or whose bm/am can't be played are skipped and counted
+# run from the repository root:
+#   python -m chess.epd FILE.epd [--depth N] [--time-limit S] [--difficulty 1|2] [--output FILE.jsonl] [--stats]
+
+import argparse
+import json
+import time
+
+from chess import ChessAI, ChessEngine, pgn, tablebase
+from chess.ChessEngine import MOVE_SQUARES
+
+
+# the EPD records of a file, skipping blank lines and # comments
+def read_epd(path):
+    with open(path) as epd_file:
+        for line in epd_file:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield line
+
+
+# id operation of a record load_epd refused, if its operations can still be read, else its number in the file
+def record_id(record, number):
+    fields = record.split(None, 4)
+    try:
+        operations = ChessEngine.parse_epd_operations(fields[4] if len(fields) > 4 else "")
+    except ValueError:
+        operations = {}
+    return " ".join(operations.get("id", [])) or str(number)
+
+
+# searches every position of epd_path (depth plies below the root move, like generate_smart_move) and writes a
+# JSON line for each to output (a file object, or None); returns the totals of the run
+# stats=True adds the SearchStats summary of every search to its line
+def analyze(epd_path, depth, difficulty=2, time_limit=None, output=None, log=print, stats=False):
+    ai = ChessAI.AI(tablebases=tablebase.Tablebases(), stats=ChessAI.SearchStats() if stats else None)
+    totals = {"positions": 0, "tested": 0, "solved": 0, "unreadable": 0, "nodes": 0, "seconds": 0.0}
+    for number, record in enumerate(read_epd(epd_path), 1):
+        gs = ChessEngine.GameState()
+        try:
+            operations = gs.load_epd(record)
+        except ValueError as error:
+            # a broken record only costs its own line, the rest of the file goes on
+            totals["unreadable"] += 1
+            log(f"{record_id(record, number)}: skipped, {error}")
+            continue
+        position_id = " ".join(operations.get("id", [])) or str(number)
+        best = [pgn.parse_san(gs, san) for san in operations.get("bm", [])]
+        avoid = [pgn.parse_san(gs, san) for san in operations.get("am", [])]
+        if None in best or None in avoid:
+            # castling, en passant or underpromotion, which this engine can't play
+            totals["unreadable"] += 1
+            log(f"{position_id}: skipped, bm/am {operations.get('bm', []) + operations.get('am', [])} can't be played here")
+            continue
+        if ai.tt is not None:
+            ai.tt.clear() # positions are searched independently, so the numbers don't depend on the order of the file
+        start = time.perf_counter()
+        move = ai.generate_smart_move(gs, depth, difficulty, time_limit)
+        seconds = time.perf_counter() - start
+        result = {"id": position_id, "fen": gs.get_fen(), "move": pgn.move_to_san(gs, move) if move is not None else None,
+                  "score": ai.best_score, "depth": ai.completed_depth, "nodes": ai.nodes, "seconds": round(seconds, 4)}
+        solved = None
+        if best or avoid:
+            move_id = move & MOVE_SQUARES if move is not None else None
+            if best:
+                solved = move_id in [best_move & MOVE_SQUARES for best_move in best]
+            else:
+                solved = move_id not in [avoid_move & MOVE_SQUARES for avoid_move in avoid]
+            result["expected"] = operations.get("bm", [])
+            result["avoid"] = operations.get("am", [])
+            totals["tested"] += 1
+            totals["solved"] += solved
+        result["solved"] = solved
+        if ai.stats is not None:
+            result["stats"] = ai.stats.summary()
+        totals["positions"] += 1
+        totals["nodes"] += ai.nodes
+        totals["seconds"] += seconds
+        if output is not None:
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+        verdict = "" if solved is None else ", solved" if solved else ", failed"
+        log(f"{position_id}: {result['move']} score {ai.best_score} depth {ai.completed_depth}, {ai.nodes} nodes "
+            f"in {seconds:.2f}s{verdict}")
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="search every position of an EPD file")
+    parser.add_argument("epd")
+    parser.add_argument("--depth", type=int, default=2, help="plies below the root move")
+    parser.add_argument("--time-limit", type=float, help="seconds per position")
+    parser.add_argument("--difficulty", type=int, choices=(1, 2), default=2)
+    parser.add_argument("--output", help="JSONL file of the results (stdout keeps the progress lines)")
+    parser.add_argument("--stats", action="store_true", help="add the search statistics of every position to its result")
+    args = parser.parse_args()
+
+    output = open(args.output, "w") if args.output else None
+    try:
+        totals = analyze(args.epd, args.depth, args.difficulty, args.time_limit, output, stats=args.stats)
+    finally:
+        if output is not None:
+            output.close()
+    nodes_per_second = totals["nodes"] / totals["seconds"] if totals["seconds"] else 0
+    print(f"{totals['positions']} positions, {totals['nodes']} nodes in {totals['seconds']:.2f}s "
+          f"({nodes_per_second:,.0f} nodes/s)")
+    if totals["tested"]:
+        print(f"solved {totals['solved']}/{totals['tested']} ({totals['solved'] / totals['tested']:.0%})"
+              + (f", {totals['unreadable']} skipped" if totals["unreadable"] else ""))
+    elif totals["unreadable"]:
+        print(f"{totals['unreadable']} skipped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Searching on several cores at once with a multiprocessing pool, in one of two ways:
+# root split - the first root move is searched with a full window, then the others are shared out to the workers and
+#     searched with a null window around its score; only the ones that turn out better are searched again for their
+#     exact score, so at a fixed depth the move and score are the same as the generate_smart_move of an
+#     AI(**ParallelSearch.ROOT_SPLIT_OPTIONS)
+#     the workers search without null move pruning and late move reductions: those decide what to prune by the window,
+#     and the null windows the workers get aren't the ones the serial search uses, so the scores would drift apart
+# lazy smp - every worker searches the whole root position, half of them one ply deeper, sharing one transposition
+#     table in shared memory so each skips the subtrees the others already searched; the main worker's result is used
+
+import multiprocessing
+import time
+
+from chess import ChessAI, ChessEngine
+
+# the AI of the current worker process, made by _init_worker
+_worker_ai = None
+
+
+def _init_worker(tt_size_mb, shared_buffers, stop_event, ai_options):
+    global _worker_ai
+    _worker_ai = ChessAI.AI(tt_size_mb=0 if shared_buffers is not None else tt_size_mb, **ai_options)
+    if shared_buffers is not None:
+        _worker_ai.tt = ChessAI.TranspositionTable.from_shared(shared_buffers)
+    _worker_ai.shared_stop = stop_event
+
+
+# positions are sent to the workers as their board and side to move, which is all the search looks at
+def _load_position(board, white_to_move):
+    gs = ChessEngine.GameState()
+    gs.set_board(board, white_to_move)
+    return gs
+
+
+# moves are packed ints, so they can be sent to the workers as they are
+def _score_root_move(board, white_to_move, move, depth, difficulty, time_limit, alpha, beta):
+    gs = _load_position(board, white_to_move)
+    score = _worker_ai.score_move(gs, move, depth, difficulty, time_limit, alpha, beta)
+    return move, score, _worker_ai.nodes
+
+
+def _lazy_smp_search(board, white_to_move, depth, difficulty, time_limit):
+    gs = _load_position(board, white_to_move)
+    move = _worker_ai.generate_smart_move(gs, depth, difficulty, time_limit)
+    return move, _worker_ai.best_score, _worker_ai.completed_depth, _worker_ai.nodes
+
+
+class ParallelSearch():
+    MODES = ("root", "lazy_smp")
+    # AI options of the root split workers (lazy smp workers use the AI's defaults)
+    ROOT_SPLIT_OPTIONS = {"null_move": False, "late_move_reductions": False}
+
+    # workers defaults to the number of cores; the pool is started once and reused for every search
+    def __init__(self, workers=None, mode="root", tt_size_mb=16):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown parallel search mode {mode!r}, expected one of {self.MODES}")
+        self.workers = workers or multiprocessing.cpu_count()
+        self.mode = mode
+        self.stop_event = multiprocessing.Event()
+        # lazy smp workers share one table, root split workers each keep their own between iterations
+        self.tt = ChessAI.TranspositionTable(tt_size_mb, shared=True) if mode == "lazy_smp" else None
+        shared_buffers = self.tt.shared_buffers if self.tt is not None else None
+        ai_options = self.ROOT_SPLIT_OPTIONS if mode == "root" else {}
+        self.pool = multiprocessing.Pool(self.workers, _init_worker, (tt_size_mb, shared_buffers, self.stop_event, ai_options))
+        self.nodes = 0
+        self.best_score = None
+        self.completed_depth = -1
+
+    # same arguments and result as AI.generate_smart_move; nodes, best_score and completed_depth are set afterwards
+    def generate_smart_move(self, gs, depth, difficulty, time_limit=None):
+        self.nodes = 0
+        self.best_score = None
+        self.completed_depth = -1
+        if self.mode == "root":
+            return self.root_split(gs, depth, difficulty, time_limit)
+        return self.lazy_smp(gs, depth, difficulty, time_limit)
+
+    # iterative deepening like the serial search, except that each iteration scores the root moves in parallel
+    # the best move goes to the front of the list after every iteration, so ties are broken the same way
+    def root_split(self, gs, depth, difficulty, time_limit):
+        start_time = time.perf_counter()
+        root_moves = gs.get_valid_moves()
+        if len(root_moves) == 0:
+            return None
+        ChessAI.MoveOrdering().order(root_moves, -1, 0)
+        best_move = root_moves[0]
+        for current_depth in range(depth + 1):
+            remaining = time_limit - (time.perf_counter() - start_time) if time_limit is not None else None
+            result = self.split_iteration(gs, root_moves, current_depth, difficulty, remaining)
+            if result is None:
+                break
+            self.best_score, best_move = result
+            self.completed_depth = current_depth
+            root_moves.remove(best_move)
+            root_moves.insert(0, best_move)
+            if time_limit is not None and time.perf_counter() - start_time > time_limit / 2:
+                break
+        return best_move
+
+    # scores the given moves in parallel; returns {move: score}, or None if the time limit ran out
+    def score_moves(self, gs, moves, depth, difficulty, time_limit, alpha, beta):
+        board = gs.board
+        tasks = [(board, gs.white_to_move, move, depth, difficulty, time_limit, alpha, beta) for move in moves]
+        scores = {}
+        for move, score, nodes in self.pool.starmap(_score_root_move, tasks, chunksize=1):
+            scores[move] = score
+            self.nodes += nodes
+        return None if None in scores.values() else scores
+
+    # one iteration of the root split; returns (best score, best move) or None if the time limit ran out
+    def split_iteration(self, gs, root_moves, depth, difficulty, time_limit):
+        deadline = time.perf_counter() + time_limit if time_limit is not None else None
+        remaining = lambda: deadline - time.perf_counter() if deadline is not None else None
+        max_player = gs.white_to_move
+        first = self.score_moves(gs, root_moves[:1], depth, difficulty, remaining(), -ChessAI.CHECKMATE, ChessAI.CHECKMATE)
+        if first is None:
+            return None
+        best_score = first[root_moves[0]]
+        # a null window only tells whether a move beats the first one, which is all most of them need
+        window = (best_score, best_score + 1) if max_player else (best_score - 1, best_score)
+        scores = self.score_moves(gs, root_moves[1:], depth, difficulty, remaining(), *window)
+        if scores is None:
+            return None
+        better = [move for move in root_moves[1:] if (scores[move] > best_score if max_player
+                                                      else scores[move] < best_score)]
+        if better:
+            window = (best_score, ChessAI.CHECKMATE) if max_player else (-ChessAI.CHECKMATE, best_score)
+            exact = self.score_moves(gs, better, depth, difficulty, remaining(), *window)
+            if exact is None:
+                return None
+            scores.update(exact)
+        best_move = root_moves[0]
+        for move in better:
+            score = scores[move]
+            if score > best_score if max_player else score < best_score:
+                best_score = score
+                best_move = move
+        return best_score, best_move
+
+    # worker 0 searches to depth, the helpers alternate between depth and depth + 1 and are stopped once it is done
+    def lazy_smp(self, gs, depth, difficulty, time_limit):
+        if len(gs.get_valid_moves()) == 0:
+            return None
+        self.tt.clear()
+        board = gs.board
+        helpers = [self.pool.apply_async(_lazy_smp_search, (board, gs.white_to_move, depth + i % 2, difficulty, time_limit))
+                   for i in range(1, self.workers)]
+        try:
+            move, self.best_score, self.completed_depth, self.nodes = self.pool.apply(
+                _lazy_smp_search, (board, gs.white_to_move, depth, difficulty, time_limit))
+        finally:
+            self.stop_event.set()
+            for helper in helpers:
+                self.nodes += helper.get()[3]
+            self.stop_event.clear()
+        return move
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,131 @@
+# Perft: counts the leaf nodes of the legal move tree to a fixed depth, the standard correctness test and speed
+# measure for a move generator
+# also checks that load_fen refuses broken positions
+# run from the repository root: python -m chess.perft [--depth N] [--position NAME] [--fen FEN] [--divide]
+
+import argparse
+import time
+
+from chess import ChessEngine
+
+# (name, FEN, node counts for depth 1, 2, 3...)
+# the positions are the usual reference ones, but this engine has no castling or en passant and always promotes to a
+# queen, so the counts are for those rules (computed with an independent generator restricted the same way) and only
+# match the published ones where those moves can't come up yet
+REFERENCE_POSITIONS = [
+    ("start", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1", [20, 400, 8902, 197281]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w - - 0 1", [46, 1865, 86585]),
+    ("endgame", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2810, 43087, 671300]),
+    ("discovered checks", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w - - 0 1", [6, 222, 7855]),
+    ("promotion tricks", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w - - 1 8", [40, 1339, 51750]),
+    ("middlegame", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", [46, 2079, 89890]),
+    ("promotions", "n1n5/PPPk4/8/8/8/8/4Kppp/5N1N b - - 0 1", [15, 210, 3253, 47828]),
+]
+
+# (what's wrong, FEN) of positions load_fen has to refuse with a ValueError
+BAD_FENS = [
+    ("empty", ""),
+    ("unknown piece", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNX w - - 0 1"),
+    ("short row", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBN w - - 0 1"),
+    ("7 rows", "rnbqkbnr/pppppppp/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"),
+    ("bad side to move", "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR x - - 0 1"),
+    ("no black king", "rnbq1bnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w - - 0 1"),
+    ("side not to move in check", "4k3/8/8/8/8/8/8/4R1K1 w - - 0 1"),
+    ("side not to move in check, black to move", "4k3/8/8/8/8/5n2/8/4K3 b - - 0 1"),
+]
+
+
+def perft(gs, depth):
+    if depth == 0:
+        return 1
+    moves = gs.get_valid_moves()
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        gs.make_move(move)
+        nodes += perft(gs, depth - 1)
+        gs.undo_move()
+    return nodes
+
+
+# perft split by root move: {move notation: nodes}, for finding which move a wrong count comes from
+def divide(gs, depth):
+    counts = {}
+    for move in gs.get_valid_moves():
+        gs.make_move(move)
+        counts[ChessEngine.Move(move).get_chess_notation()] = perft(gs, depth - 1)
+        gs.undo_move()
+    return counts
+
+
+# names of the BAD_FENS load_fen accepted
+def check_bad_fens():
+    accepted = []
+    for name, fen in BAD_FENS:
+        try:
+            load(fen)
+        except ValueError:
+            continue
+        accepted.append(name)
+    return accepted
+
+
+def load(fen):
+    gs = ChessEngine.GameState()
+    gs.load_fen(fen)
+    return gs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="perft node counts and move generator speed")
+    parser.add_argument("--depth", type=int, help="search every position to this depth instead of its deepest known count")
+    parser.add_argument("--position", help="only run the reference position with this name")
+    parser.add_argument("--fen", help="run this position instead of the reference ones (needs --depth)")
+    parser.add_argument("--divide", action="store_true", help="print the node count of every root move")
+    args = parser.parse_args()
+
+    if args.fen:
+        if args.depth is None:
+            parser.error("--fen needs --depth")
+        positions = [("fen", args.fen, [])]
+    else:
+        positions = [position for position in REFERENCE_POSITIONS if args.position in (None, position[0])]
+        if not positions:
+            parser.error(f"no reference position named {args.position!r}")
+
+    failed = []
+    total_nodes = 0
+    total_seconds = 0.0
+    for name, fen, counts in positions:
+        depth = args.depth or len(counts)
+        gs = load(fen)
+        start = time.perf_counter()
+        if args.divide:
+            split = divide(gs, depth)
+            nodes = sum(split.values())
+        else:
+            nodes = perft(gs, depth)
+        seconds = time.perf_counter() - start
+        total_nodes += nodes
+        total_seconds += seconds
+        expected = counts[depth - 1] if 0 < depth <= len(counts) else None
+        status = "" if expected is None else " ok" if nodes == expected else f" WRONG, expected {expected}"
+        print(f"{name:>18}: perft({depth}) = {nodes} in {seconds:.2f}s ({nodes / max(seconds, 1e-9):,.0f} nodes/s){status}")
+        if args.divide:
+            for move, count in sorted(split.items()):
+                print(f"{'':>20}{move}: {count}")
+        if expected is not None and nodes != expected:
+            failed.append(name)
+
+    if not args.fen:
+        accepted = check_bad_fens()
+        print(f"{'bad FENs':>18}: {len(BAD_FENS) - len(accepted)} of {len(BAD_FENS)} refused")
+        failed += [f"bad FEN accepted ({name})" for name in accepted]
+    print(f"{'total':>18}: {total_nodes} nodes in {total_seconds:.2f}s ({total_nodes / max(total_seconds, 1e-9):,.0f} nodes/s)")
+    if failed:
+        raise SystemExit(f"failed: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# Reading and writing PGN: games as tag pairs plus the main line in standard algebraic notation (SAN)
+# castling, en passant and underpromotions don't exist in this engine, so moves using them can't be read or written
+
+import re
+
+from chess import ChessEngine
+
+FILES = "abcdefgh"
+PIECE_LETTERS = "pNBRQK" # by piece type, pawns having no letter in SAN
+# comments, variations, NAGs, move numbers and results: everything in PGN movetext that isn't a move
+MOVETEXT_NOISE = re.compile(r"\{[^}]*\}|;[^\n]*|\$\d+|\d+\.(\.\.)?|1-0|0-1|1/2-1/2|\*")
+# the tags every PGN game starts with, in this order
+SEVEN_TAG_ROSTER = ("Event", "Site", "Date", "Round", "White", "Black", "Result")
+LINE_LENGTH = 79
+
+
+# yields (tags, list of SAN moves) for every game of a PGN file
+def read_pgn(path):
+    tags = {}
+    movetext = []
+    with open(path, encoding="utf-8", errors="replace") as pgn:
+        for line in pgn:
+            line = line.strip()
+            if line.startswith("["):
+                if movetext:
+                    yield tags, parse_movetext(" ".join(movetext))
+                    tags, movetext = {}, []
+                match = re.match(r'\[(\w+)\s+"(.*)"\]', line)
+                if match:
+                    tags[match.group(1)] = match.group(2)
+            elif line:
+                movetext.append(line)
+    if movetext:
+        yield tags, parse_movetext(" ".join(movetext))
+
+
+# the main line SAN moves of a game's movetext
+def parse_movetext(movetext):
+    # variations can be nested, so they are cut out with a depth counter rather than a regex
+    main_line = []
+    depth = 0
+    for char in re.sub(r"\{[^}]*\}", " ", movetext):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif depth == 0:
+            main_line.append(char)
+    return MOVETEXT_NOISE.sub(" ", "".join(main_line)).split()
+
+
+# the legal move of gs written as san, or None if there isn't one this engine can play (castling, en passant and
+# underpromotions don't exist here)
+def parse_san(gs, san):
+    san = san.rstrip("+#!?")
+    if san.startswith("O-O") or san.startswith("0-0"):
+        return None
+    promotion = None
+    if "=" in san:
+        san, promotion = san.split("=", 1)
+    elif len(san) > 2 and san[-1] in "QRBN" and san[0] in FILES:
+        san, promotion = san[:-1], san[-1]
+    if promotion is not None and promotion[:1] != "Q":
+        return None
+    piece_type = PIECE_LETTERS.index(san[0]) if san[0] in "NBRQK" else ChessEngine.PAWN
+    body = san[1:] if piece_type != ChessEngine.PAWN else san
+    body = body.replace("x", "").replace("-", "")
+    if len(body) < 2 or body[-2] not in FILES or body[-1] not in "12345678":
+        return None
+    end = (8 - int(body[-1])) * 8 + FILES.index(body[-2])
+    origin = body[:-2] # file and/or rank of the start square when the move is ambiguous
+    matches = []
+    for move in gs.get_valid_moves():
+        start = move & 63
+        if (move >> 6 & 63 != end or (move >> 12 & 15) % 6 != piece_type
+                or any(FILES[start & 7] != char if char in FILES else str(8 - (start >> 3)) != char for char in origin)):
+            continue
+        matches.append(move)
+    return matches[0] if len(matches) == 1 else None
+
+
+# SAN of move, a legal move of gs: e4, Nbd2, exd5, e8=Q+, Qh7#
+def move_to_san(gs, move):
+    start, end = move & 63, move >> 6 & 63
+    piece = move >> 12 & 15
+    target = FILES[end & 7] + str(8 - (end >> 3))
+    capture = "x" if move & ChessEngine.CAPTURE else ""
+    if piece % 6 == ChessEngine.PAWN:
+        san = (FILES[start & 7] + capture if capture else "") + target + ("=Q" if move & ChessEngine.PROMOTION else "")
+    else:
+        # the start square is only given as far as needed to tell the move from another piece's to the same square
+        rivals = [other & 63 for other in gs.get_valid_moves()
+                  if other != move and other >> 6 & 63 == end and other >> 12 & 15 == piece]
+        origin = ""
+        if rivals:
+            if all(sq & 7 != start & 7 for sq in rivals):
+                origin = FILES[start & 7]
+            elif all(sq >> 3 != start >> 3 for sq in rivals):
+                origin = str(8 - (start >> 3))
+            else:
+                origin = FILES[start & 7] + str(8 - (start >> 3))
+        san = PIECE_LETTERS[piece % 6] + origin + capture + target
+    # looking at the reply moves sets the game over flags, which belong to gs
+    flags = gs.check_mate, gs.stale_mate
+    gs.make_move(move)
+    if gs.in_check():
+        san += "#" if not gs.get_valid_moves() else "+"
+    gs.undo_move()
+    gs.check_mate, gs.stale_mate = flags
+    return san
+
+
+# a game as PGN text (ending with a blank line), from its tags and SAN moves played from the starting position
+def format_game(tags, sans):
+    lines = [f'[{name} "{tags.get(name, "?")}"]' for name in SEVEN_TAG_ROSTER]
+    lines += [f'[{name} "{value}"]' for name, value in tags.items() if name not in SEVEN_TAG_ROSTER]
+    lines.append("")
+    tokens = []
+    for i, san in enumerate(sans):
+        if i % 2 == 0:
+            tokens.append(f"{i // 2 + 1}.")
+        tokens.append(san)
+    tokens.append(tags.get("Result", "*"))
+    line = ""
+    for token in tokens:
+        if line and len(line) + 1 + len(token) > LINE_LENGTH:
+            lines.append(line)
+            line = token
+        else:
+            line = f"{line} {token}" if line else token
+    lines.append(line)
+    return "\n".join(lines) + "\n\n"
@@ -0,0 +1,168 @@
+# Self-play: plays engine-vs-engine games on a pool of processes and streams each one to PGN and/or JSONL as soon as
+# it is over, so memory doesn't grow with the number of games
+# every game opens with a few random moves (from the opening book while the position is in it) so that the games
+# differ, then both sides are played by AI.generate_smart_move
+# run from the repository root:
+#   python -m chess.selfplay --games N [--workers N] [--depth N] [--difficulty 1|2] [--time-limit S]
+#                            [--random-plies N] [--max-plies N] [--seed N] [--no-book] [--pgn FILE] [--jsonl FILE]
+
+import argparse
+import datetime
+import json
+import multiprocessing
+import os
+import random
+import time
+from array import array
+
+from chess import ChessAI, ChessEngine, book, pgn, tablebase
+from chess.uci import move_to_uci
+
+DEFAULT_MAX_PLIES = 300 # games still going after this many plies are adjudicated as draws
+
+# the AI and opening book of the current worker process, made by _init_worker
+_worker_ai = None
+_worker_book = None
+
+
+def _init_worker(tt_size_mb, use_book):
+    global _worker_ai, _worker_book
+    _worker_ai = ChessAI.AI(tt_size_mb=tt_size_mb, tablebases=tablebase.Tablebases())
+    _worker_book = book.OpeningBook(book.DEFAULT_PATH) if use_book and os.path.exists(book.DEFAULT_PATH) else None
+
+
+# no pawns, rooks or queens and at most one bishop or knight left: nobody can mate
+def insufficient_material(gs):
+    bitboards = gs.bitboards
+    for colour in (ChessEngine.WHITE, ChessEngine.BLACK):
+        if bitboards[colour * 6 + ChessEngine.PAWN] | bitboards[colour * 6 + ChessEngine.ROOK] | bitboards[colour * 6 + ChessEngine.QUEEN]:
+            return False
+    minors = 0
+    for colour in (ChessEngine.WHITE, ChessEngine.BLACK):
+        minors += (bitboards[colour * 6 + ChessEngine.KNIGHT] | bitboards[colour * 6 + ChessEngine.BISHOP]).bit_count()
+    return minors <= 1
+
+
+# (result, termination) of a game whose legal moves are valid_moves, (None, None) while it goes on
+def game_over(gs, valid_moves, max_plies):
+    if not valid_moves:
+        if gs.check_mate:
+            return ("0-1" if gs.white_to_move else "1-0"), "checkmate"
+        return "1/2-1/2", "stalemate"
+    if gs.key_history.count(gs.zobrist_key) >= 3:
+        return "1/2-1/2", "repetition"
+    if insufficient_material(gs):
+        return "1/2-1/2", "insufficient material"
+    if len(gs.move_log) >= max_plies:
+        return "1/2-1/2", "move limit"
+    return None, None
+
+
+# plays one game in a worker; returns it as a dict (moves in SAN and UCI notation, seconds per AI move)
+def _play_game(task):
+    number, seed, depth, difficulty, time_limit, random_plies, max_plies = task
+    rng = random.Random(seed * 1000003 + number)
+    if _worker_ai.tt is not None:
+        _worker_ai.tt.clear()
+    gs = ChessEngine.GameState()
+    sans, moves, latencies = [], [], []
+    start = time.perf_counter()
+    while True:
+        valid_moves = gs.get_valid_moves()
+        result, termination = game_over(gs, valid_moves, max_plies)
+        if result is not None:
+            break
+        if len(gs.move_log) < random_plies:
+            move = _worker_book.choose_move(gs, rng) if _worker_book is not None else None
+            if move is None:
+                move = rng.choice(valid_moves)
+        else:
+            move_start = time.perf_counter()
+            move = _worker_ai.generate_smart_move(gs, depth, difficulty, time_limit)
+            latencies.append(time.perf_counter() - move_start)
+        sans.append(pgn.move_to_san(gs, move))
+        moves.append(move_to_uci(move))
+        gs.make_move(move)
+    return {"game": number, "result": result, "termination": termination, "plies": len(moves),
+            "seconds": round(time.perf_counter() - start, 3), "moves": moves, "san": sans,
+            "move_seconds": [round(seconds, 4) for seconds in latencies]}
+
+
+# value below which fraction of the sorted values lie
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+# plays games games on workers processes, writing each to the PGN and JSONL files (either may be None) as it
+# finishes; returns a summary of the run
+def run(games, workers=None, depth=1, difficulty=2, time_limit=None, random_plies=4, max_plies=DEFAULT_MAX_PLIES,
+        seed=0, use_book=True, pgn_path=None, jsonl_path=None, tt_size_mb=16, log=print):
+    workers = workers or multiprocessing.cpu_count()
+    pgn_file = open(pgn_path, "w") if pgn_path else None
+    jsonl_file = open(jsonl_path, "w") if jsonl_path else None
+    results = {"1-0": 0, "0-1": 0, "1/2-1/2": 0}
+    latencies = array("d") # seconds of every AI move, for the percentiles
+    plies = 0
+    player = f"chess_engine depth {depth} difficulty {difficulty}"
+    tasks = ((number, seed, depth, difficulty, time_limit, random_plies, max_plies) for number in range(1, games + 1))
+    start = time.perf_counter()
+    try:
+        with multiprocessing.Pool(workers, _init_worker, (tt_size_mb, use_book)) as pool:
+            for game in pool.imap_unordered(_play_game, tasks):
+                results[game["result"]] += 1
+                plies += game["plies"]
+                latencies.extend(game["move_seconds"])
+                if pgn_file is not None:
+                    tags = {"Event": "Self-play", "Site": "chess_engine", "Date": datetime.date.today().strftime("%Y.%m.%d"),
+                            "Round": str(game["game"]), "White": player, "Black": player, "Result": game["result"],
+                            "Termination": game["termination"], "PlyCount": str(game["plies"])}
+                    pgn_file.write(pgn.format_game(tags, game["san"]))
+                    pgn_file.flush()
+                if jsonl_file is not None:
+                    jsonl_file.write(json.dumps({key: value for key, value in game.items() if key != "san"}) + "\n")
+                    jsonl_file.flush()
+                log(f"game {game['game']}: {game['result']} by {game['termination']} after {game['plies']} plies "
+                    f"({game['seconds']:.1f}s)")
+    finally:
+        for output in (pgn_file, jsonl_file):
+            if output is not None:
+                output.close()
+    seconds = time.perf_counter() - start
+    summary = {"games": games, "workers": workers, "results": results, "plies": plies, "seconds": seconds,
+               "games_per_hour": games * 3600 / seconds, "ai_moves": len(latencies)}
+    if latencies:
+        ordered = sorted(latencies)
+        summary["move_latency"] = {"p50": percentile(ordered, 0.5), "p90": percentile(ordered, 0.9),
+                                   "p99": percentile(ordered, 0.99), "max": ordered[-1]}
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="parallel engine self-play with streaming PGN/JSONL output")
+    parser.add_argument("--games", type=int, default=10)
+    parser.add_argument("--workers", type=int, help="processes (the number of cores by default)")
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--difficulty", type=int, choices=(1, 2), default=2)
+    parser.add_argument("--time-limit", type=float, help="seconds per AI move")
+    parser.add_argument("--random-plies", type=int, default=4, help="random opening plies of every game")
+    parser.add_argument("--max-plies", type=int, default=DEFAULT_MAX_PLIES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-book", action="store_true", help="random opening moves without the opening book")
+    parser.add_argument("--pgn")
+    parser.add_argument("--jsonl")
+    args = parser.parse_args()
+
+    summary = run(args.games, args.workers, args.depth, args.difficulty, args.time_limit, args.random_plies,
+                  args.max_plies, args.seed, not args.no_book, args.pgn, args.jsonl)
+    results = summary["results"]
+    print(f"{summary['games']} games on {summary['workers']} workers in {summary['seconds']:.1f}s "
+          f"({summary['games_per_hour']:.0f} games/hour): +{results['1-0']} ={results['1/2-1/2']} -{results['0-1']}, "
+          f"{summary['plies']} plies")
+    if "move_latency" in summary:
+        latency = summary["move_latency"]
+        print(f"AI move latency over {summary['ai_moves']} moves: p50 {latency['p50'] * 1000:.0f} ms, "
+              f"p90 {latency['p90'] * 1000:.0f} ms, p99 {latency['p99'] * 1000:.0f} ms, max {latency['max'] * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
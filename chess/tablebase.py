@@ -0,0 +1,383 @@
+# Endgame tablebases: the distance to mate of every position of the pawnless endings with up to 4 pieces, worked out
+# backwards from the mates (retrograde analysis) on top of the engine's move generator
+# a table is one signed byte per position (> 0: the side to move mates in that many moves, < 0: it is mated in
+# -value - 1 moves, 0: draw), in a file the search maps into memory and probes without loading it
+# tables are named after their material, white's pieces then black's, each side starting with its king: KQK, KRKN, ...
+# run from the repository root:
+#   python -m chess.tablebase build [NAME ...] [--all] [-d DIR]   generates tables (and the smaller ones they need)
+#   python -m chess.tablebase probe FEN [-d DIR]                   prints the distance to mate of a position
+
+import argparse
+import mmap
+import os
+import time
+from array import array
+
+from chess import ChessEngine
+from chess.ChessEngine import (KNIGHT, BISHOP, ROOK, QUEEN, KING, CAPTURE, KNIGHT_ATTACKS, KING_ATTACKS, BISHOP_RAYS,
+                               ROOK_RAYS, QUEEN_RAYS, slider_attacks)
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tablebases")
+EXTENSION = ".dtm"
+PIECE_LETTERS = "PNBRQK" # by piece type
+THREE_PIECE = ("KQK", "KRK")
+FOUR_PIECE = ("KQQK", "KQRK", "KQBK", "KQNK", "KRRK", "KRBK", "KRNK", "KBBK", "KBNK", "KNNK",
+              "KQKQ", "KQKR", "KQKB", "KQKN", "KRKR", "KRKB", "KRKN", "KBKB", "KBKN", "KNKN")
+# endings nobody can win, which need no table
+DRAWN = ("KK", "KBK", "KNK", "KKB", "KKN")
+SLIDER_RAYS = {BISHOP: BISHOP_RAYS, ROOK: ROOK_RAYS, QUEEN: QUEEN_RAYS}
+
+
+# square sq after symmetry t of the board: bit 4 swaps rows and columns, bit 1 mirrors the columns, bit 2 the rows
+# without pawns all 8 symmetries leave the game the same
+def transform(sq, t):
+    r, c = sq >> 3, sq & 7
+    if t & 4:
+        r, c = c, r
+    if t & 1:
+        c = 7 - c
+    if t & 2:
+        r = 7 - r
+    return r * 8 + c
+
+
+TRANSFORMS = [[transform(sq, t) for sq in range(64)] for t in range(8)]
+# the white king is always moved into the a1-d1-d4 triangle, which cuts the tables 6.4 times
+TRIANGLE = [sq for sq in range(64) if sq >> 3 >= 4 and sq & 7 <= 3 and 7 - (sq >> 3) <= sq & 7]
+TRIANGLE_INDEX = [TRIANGLE.index(sq) if sq in TRIANGLE else -1 for sq in range(64)]
+# for each white king square, the symmetries that take it into the triangle (two for the squares that land on its
+# diagonal, one otherwise)
+KING_TRANSFORMS = [[table for table in TRANSFORMS if table[sq] in TRIANGLE] for sq in range(64)]
+
+
+# squares a piece of type piece_type on sq attacks (pawns aren't in the tables)
+def attacks(piece_type, sq, occupied):
+    if piece_type == KNIGHT:
+        return KNIGHT_ATTACKS[sq]
+    if piece_type == KING:
+        return KING_ATTACKS[sq]
+    return slider_attacks(sq, occupied, SLIDER_RAYS[piece_type])
+
+
+# "KQ", "KR", ... of a list of piece types
+def side_name(piece_types):
+    return "".join(PIECE_LETTERS[piece_type] for piece_type in piece_types)
+
+
+# name of the same ending with the stronger side as white, which is how tables are stored
+def normalize(name):
+    split = name.index("K", 1)
+    white, black = name[:split], name[split:]
+    strength = lambda side: (len(side), sorted(PIECE_LETTERS.index(letter) for letter in side)[::-1])
+    return black + white if strength(black) > strength(white) else name
+
+
+# the pieces of a table and how its positions are numbered: the white king's triangle square, then every other
+# piece's square (white's pieces, then black's, strongest first), then the side to move
+class Material():
+
+    def __init__(self, name):
+        split = name.index("K", 1)
+        self.name = name
+        self.white = tuple(PIECE_LETTERS.index(letter) for letter in name[:split])
+        self.black = tuple(PIECE_LETTERS.index(letter) for letter in name[split:])
+        if self.white[0] != KING or self.black[0] != KING or KING in self.white[1:] + self.black[1:] or 0 in self.white + self.black:
+            raise ValueError(f"bad material {name!r}: each side needs a king first and no pawns")
+        self.pieces = tuple(ChessEngine.WHITE * 6 + piece_type for piece_type in self.white) + \
+                      tuple(ChessEngine.BLACK * 6 + piece_type for piece_type in self.black)
+        self.black_king = len(self.white) # position of the black king in self.pieces
+        self.size = len(TRIANGLE) * 64 ** (len(self.pieces) - 1) * 2
+        # runs of identical pieces, whose squares are sorted so a position has the same index whichever is which
+        self.groups = []
+        start = 0
+        for i in range(1, len(self.pieces) + 1):
+            if i == len(self.pieces) or self.pieces[i] != self.pieces[start]:
+                if i - start > 1:
+                    self.groups.append((start, i))
+                start = i
+
+    # index of the position with the pieces on squares: the smallest one among its symmetric images, so every
+    # image of a position shares one entry
+    def index(self, squares, white_to_move):
+        best = -1
+        for table in KING_TRANSFORMS[squares[0]]:
+            mapped = [table[sq] for sq in squares]
+            for start, end in self.groups:
+                mapped[start:end] = sorted(mapped[start:end])
+            i = TRIANGLE_INDEX[mapped[0]]
+            for sq in mapped[1:]:
+                i = i * 64 + sq
+            i = i * 2 + (not white_to_move)
+            if best < 0 or i < best:
+                best = i
+        return best
+
+    # (squares, white_to_move) of an index
+    def decode(self, index):
+        white_to_move = not index & 1
+        index >>= 1
+        squares = []
+        for _ in range(len(self.pieces) - 1):
+            squares.append(index & 63)
+            index >>= 6
+        squares.append(TRIANGLE[index])
+        squares.reverse()
+        return squares, white_to_move
+
+
+# the tables of a directory, mapped into memory
+class Tablebases():
+
+    def __init__(self, directory=DEFAULT_DIRECTORY):
+        self.directory = directory
+        self.tables = {} # name -> (Material, mapped file)
+        self.max_pieces = 0 # positions with more pieces than this are never in a table
+        if os.path.isdir(directory):
+            for file_name in sorted(os.listdir(directory)):
+                if file_name.endswith(EXTENSION):
+                    self.open(os.path.join(directory, file_name))
+
+    def open(self, path):
+        material = Material(os.path.basename(path)[:-len(EXTENSION)])
+        with open(path, "rb") as table_file:
+            if os.fstat(table_file.fileno()).st_size != material.size:
+                raise ValueError(f"{path} should be {material.size} bytes long")
+            data = mmap.mmap(table_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.tables[material.name] = (material, data)
+        self.max_pieces = max(self.max_pieces, len(material.pieces))
+
+    def __contains__(self, name):
+        return name in self.tables or normalize(name) in self.tables or name in DRAWN
+
+    # value of the position of (piece index, square) pairs, None when there is no table for it
+    def probe_pieces(self, pieces, white_to_move):
+        # kings first, then the other pieces strongest first, like Material.pieces
+        white = sorted(((index, sq) for index, sq in pieces if index < 6), reverse=True)
+        black = sorted(((index - 6, sq) for index, sq in pieces if index >= 6), reverse=True)
+        white_name = side_name([piece_type for piece_type, _ in white])
+        black_name = side_name([piece_type for piece_type, _ in black])
+        if white_name + black_name in self.tables:
+            material, data = self.tables[white_name + black_name]
+            squares = [sq for _, sq in white] + [sq for _, sq in black]
+        elif black_name + white_name in self.tables:
+            # the same ending with the colours swapped: mirror the rows and hand the move to the other side
+            material, data = self.tables[black_name + white_name]
+            squares = [sq ^ 56 for _, sq in black] + [sq ^ 56 for _, sq in white]
+            white_to_move = not white_to_move
+        elif white_name + black_name in DRAWN:
+            return 0
+        else:
+            return None
+        value = data[material.index(squares, white_to_move)]
+        return value - 256 if value > 127 else value
+
+    # value of the position of gs (see the top of the file), None when there is no table for it
+    def probe(self, gs):
+        pieces = []
+        for index, bitboard in enumerate(gs.bitboards):
+            while bitboard:
+                bit = bitboard & -bitboard
+                bitboard ^= bit
+                pieces.append((index, bit.bit_length() - 1))
+        return self.probe_pieces(pieces, gs.white_to_move)
+
+    # the move of gs that keeps the best table value (quickest mate, slowest loss, else a draw), None if gs has no
+    # legal move or isn't covered
+    def best_move(self, gs):
+        best_move, best_value = None, None
+        for move in gs.get_valid_moves():
+            gs.make_move(move)
+            value = self.probe(gs)
+            gs.undo_move()
+            if value is None:
+                return None
+            # the reply's value is from the opponent's side: losing quickly for them is winning quickly for us
+            key = (0, value) if value < 0 else (2, -value) if value > 0 else (1, 0)
+            if best_value is None or key < best_value:
+                best_move, best_value = move, key
+        return best_move
+
+    def close(self):
+        for _, data in self.tables.values():
+            data.close()
+        self.tables = {}
+
+
+# the positions that lead to position index with a non-capturing move of the side that isn't to move there, as
+# indexes (without repeats)
+def predecessors(material, index):
+    squares, white_to_move = material.decode(index)
+    mover = ChessEngine.BLACK if white_to_move else ChessEngine.WHITE
+    pieces = material.pieces
+    king = squares[material.black_king if mover == ChessEngine.WHITE else 0] # the king that mustn't be left in check
+    occupied = 0
+    for sq in squares:
+        occupied |= 1 << sq
+    result = set()
+    for i, piece in enumerate(pieces):
+        if piece // 6 != mover:
+            continue
+        sq = squares[i]
+        targets = attacks(piece % 6, sq, occupied) & ~occupied
+        while targets:
+            bit = targets & -targets
+            targets ^= bit
+            previous = squares[:]
+            previous[i] = bit.bit_length() - 1
+            before = occupied ^ (1 << sq) ^ bit
+            # the other side can't have been in check when it was the mover's turn
+            if not any(pieces[j] // 6 == mover and attacks(pieces[j] % 6, previous[j], before) >> king & 1
+                       for j in range(len(pieces))):
+                result.add(material.index(previous, mover == ChessEngine.WHITE))
+    return result
+
+
+# generates the table of ending name and writes it to directory; the tables of the endings its captures lead to have
+# to be in tablebases already
+# positions are solved in order of their distance to mate in plies: the mates, then the positions one ply away, ...;
+# a position wins as soon as one of its moves reaches a lost position and loses once all of them reach won ones
+# returns the path of the table
+def generate(name, tablebases, directory=DEFAULT_DIRECTORY, log=print):
+    material = Material(name)
+    size = material.size
+    start_time = time.perf_counter()
+    gs = ChessEngine.GameState()
+    remaining = array("h", [-1]) * size # moves to positions of this table not yet known to be won for the opponent
+    safe = bytearray(size) # 1 if a capture leads to a draw or better, so the position can't be lost
+    loss_floor = array("h", [0]) * size # plies to be mated after the longest losing capture
+    pending = [[] for _ in range(2)] # pending[d]: positions that may be won (odd d) or lost (even d) in d plies
+    for index in range(size):
+        squares, white_to_move = material.decode(index)
+        if len(set(squares)) < len(squares) or material.index(squares, white_to_move) != index:
+            continue # pieces on top of each other, or a symmetric image stored under another index
+        gs.set_pieces(zip(material.pieces, squares), white_to_move)
+        us, them = (ChessEngine.WHITE, ChessEngine.BLACK) if white_to_move else (ChessEngine.BLACK, ChessEngine.WHITE)
+        if gs.attackers_to(gs.bitboards[them * 6 + KING].bit_length() - 1, us, gs.occupied):
+            continue # the side that just moved is in check
+        moves = gs.generate_valid_moves()
+        if not moves:
+            if gs.check_mate:
+                pending[0].append(index)
+            continue
+        children = set()
+        win = None
+        for move in moves:
+            start, end = move & 63, move >> 6 & 63
+            child = squares[:]
+            child[squares.index(start)] = end
+            if not move & CAPTURE:
+                children.add(material.index(child, not white_to_move))
+                continue
+            captured = squares.index(end)
+            value = tablebases.probe_pieces([(piece, sq) for i, (piece, sq) in enumerate(zip(material.pieces, child))
+                                             if i != captured], not white_to_move)
+            if value is None:
+                raise RuntimeError(f"{name} needs the table of the ending its captures lead to")
+            if value > 0:
+                loss_floor[index] = max(loss_floor[index], 2 * value)
+                continue
+            safe[index] = 1
+            if value < 0: # the capture reaches a lost position: won in one more ply than the opponent needs to lose
+                plies = 2 * (-value - 1) + 1
+                win = plies if win is None else min(win, plies)
+        remaining[index] = len(children)
+        schedule(pending, index, win)
+        if not children and not safe[index]:
+            schedule(pending, index, loss_floor[index])
+
+    plies = array("h", [-1]) * size
+    d = 0
+    while d < len(pending):
+        for index in pending[d]:
+            if plies[index] >= 0:
+                continue
+            plies[index] = d
+            for previous in predecessors(material, index):
+                if plies[previous] >= 0:
+                    continue
+                if d % 2 == 0: # lost here, so won for whoever moved here
+                    schedule(pending, previous, d + 1)
+                else:
+                    remaining[previous] -= 1
+                    if remaining[previous] == 0 and not safe[previous]:
+                        schedule(pending, previous, max(d + 1, loss_floor[previous]))
+        pending[d] = None
+        d += 1
+
+    values = array("b", bytes(size))
+    for index in range(size):
+        d = plies[index]
+        if d >= 0:
+            values[index] = (d + 1) // 2 if d % 2 else -(d // 2) - 1
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, name + EXTENSION)
+    with open(path, "wb") as table_file:
+        values.tofile(table_file)
+    log(f"{name}: {sum(1 for d in plies if d >= 0)} won/lost positions, longest mate {(max(plies) + 1) // 2} moves, "
+        f"{time.perf_counter() - start_time:.1f}s")
+    return path
+
+
+def schedule(pending, index, plies):
+    if plies is None:
+        return
+    while len(pending) <= plies:
+        pending.append([])
+    pending[plies].append(index)
+
+
+# generates the tables of names that aren't in directory yet, smallest endings first since the bigger ones need them
+def build(names, directory=DEFAULT_DIRECTORY, log=print):
+    tablebases = Tablebases(directory)
+    for name in sorted({normalize(name) for name in names}, key=len):
+        if name in tablebases:
+            continue
+        # the endings captures lead to
+        split = name.index("K", 1)
+        for i in list(range(1, split)) + list(range(split + 1, len(name))):
+            build([name[:i] + name[i + 1:]], directory, log)
+        tablebases.close()
+        tablebases = Tablebases(directory)
+        generate(name, tablebases, directory, log)
+        tablebases.close()
+        tablebases = Tablebases(directory)
+    tablebases.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="endgame tablebase generator and probe")
+    # -d goes after the command, like the other options of each command
+    directory = argparse.ArgumentParser(add_help=False)
+    directory.add_argument("-d", "--directory", default=DEFAULT_DIRECTORY, help="where the tables are")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build_parser = commands.add_parser("build", parents=[directory], help="generate tables (the 3 piece ones by default)")
+    build_parser.add_argument("names", nargs="*", help="endings such as KRKN")
+    build_parser.add_argument("--all", action="store_true", help="every 3 and 4 piece ending (takes hours)")
+    probe_parser = commands.add_parser("probe", parents=[directory], help="look a position up")
+    probe_parser.add_argument("fen")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build(THREE_PIECE + FOUR_PIECE if args.all else args.names or THREE_PIECE, args.directory)
+        return
+    gs = ChessEngine.GameState()
+    gs.load_fen(args.fen)
+    tablebases = Tablebases(args.directory)
+    value = tablebases.probe(gs)
+    side = "white" if gs.white_to_move else "black"
+    if value is None:
+        print("no table for this position")
+    elif value > 0:
+        print(f"{side} mates in {value}")
+    elif value < 0:
+        print(f"{side} is mated in {-value - 1}")
+    else:
+        print("draw")
+    best_move = tablebases.best_move(gs) if value is not None else None
+    if best_move is not None:
+        print(f"best move {ChessEngine.Move(best_move).get_chess_notation()}")
+    tablebases.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+# Headless engine speaking UCI over stdin/stdout, for tournament managers and servers: only the engine and the AI are
+# imported (no pygame), so a process is ready to play quickly
+# supports uci, isready, ucinewgame, setoption (Hash, OwnBook, Difficulty, SearchStats), position startpos|fen ... [moves ...],
+# go [depth N] [movetime MS] [nodes N] [wtime MS btime MS winc MS binc MS movestogo N] [infinite], stop and quit
+# the engine can't castle or take en passant: position commands with such moves (or any other illegal or malformed
+# move, FEN or number) are rejected with an "info string error: ..." line and the previous position is kept, the
+# engine carries on with the next command; a search that fails reports the error the same way and still answers
+# with bestmove
+# run from the repository root: python -m chess.uci
+
+import os
+import sys
+import threading
+import time
+
+from chess import ChessAI, ChessEngine, book, tablebase
+
+NAME = "chess_engine"
+MAX_DEPTH = 64 # plies searched by "go" without a depth (until stopped or out of time)
+DEFAULT_MOVES_TO_GO = 30 # moves the remaining clock time is spread over when the GUI doesn't say
+DEFAULT_HASH_MB = 16
+
+
+# long algebraic notation of a packed move: e2e4, e7e8q
+def move_to_uci(move):
+    return ChessAI.move_notation(move)
+
+
+# the legal move of gs written as text (promotions always make a queen here, whatever piece is asked for)
+# raises ValueError for malformed text and for moves gs can't play, castling and en passant included
+def parse_move(gs, text):
+    if len(text) not in (4, 5) or text[0] not in "abcdefgh" or text[2] not in "abcdefgh" or text[1] not in "12345678" \
+            or text[3] not in "12345678":
+        raise ValueError(f"malformed move {text!r}")
+    start = (8 - int(text[1])) * 8 + "abcdefgh".index(text[0])
+    end = (8 - int(text[3])) * 8 + "abcdefgh".index(text[2])
+    for move in gs.get_valid_moves():
+        if move & 63 == start and move >> 6 & 63 == end:
+            return move
+    raise ValueError(f"illegal move {text} (castling and en passant aren't supported)")
+
+
+# score for "info score": centipawns from the side to move's point of view, or moves to mate for mate scores (which
+# count the plies to the mate)
+def format_score(score, white_to_move):
+    if not white_to_move:
+        score = -score
+    if abs(score) > ChessAI.MATE_SCORE_BOUND:
+        moves = max(1, (ChessAI.CHECKMATE - abs(score) + 1) // 2)
+        return f"mate {moves if score > 0 else -moves}"
+    return f"cp {score}"
+
+
+class UCIEngine():
+
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        self.tablebases = tablebase.Tablebases()
+        self.opening_book = book.OpeningBook(book.DEFAULT_PATH) if os.path.exists(book.DEFAULT_PATH) else None
+        self.ai = ChessAI.AI(tt_size_mb=DEFAULT_HASH_MB, book=self.opening_book, tablebases=self.tablebases)
+        self.difficulty = 2
+        self.gs = ChessEngine.GameState()
+        self.thread = None
+
+    def send(self, line):
+        self.output.write(line + "\n")
+        self.output.flush()
+
+    # handles one command line; returns False on quit
+    # a command that can't be carried out (bad move, FEN or number) is reported with an info string and changes nothing
+    def handle(self, line):
+        tokens = line.split()
+        if not tokens:
+            return True
+        command, args = tokens[0], tokens[1:]
+        try:
+            return self.run_command(command, args)
+        except ValueError as error:
+            self.send(f"info string error: {error}")
+            return True
+
+    def run_command(self, command, args):
+        if command == "uci":
+            self.send(f"id name {NAME}")
+            self.send("id author chess_engine contributors")
+            self.send(f"option name Hash type spin default {DEFAULT_HASH_MB} min 0 max 1024")
+            self.send(f"option name OwnBook type check default {'true' if self.opening_book else 'false'}")
+            self.send("option name Difficulty type spin default 2 min 1 max 2")
+            self.send("option name SearchStats type check default false")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "ucinewgame":
+            self.stop()
+            if self.ai.tt is not None:
+                self.ai.tt.clear()
+            self.gs = ChessEngine.GameState()
+        elif command == "setoption":
+            self.set_option(args)
+        elif command == "position":
+            self.stop()
+            self.set_position(args)
+        elif command == "go":
+            self.stop()
+            self.go(args)
+        elif command == "stop":
+            self.stop()
+        elif command == "quit":
+            self.stop()
+            return False
+        return True
+
+    # setoption name <name> value <value>
+    def set_option(self, args):
+        if "value" not in args:
+            return
+        name = " ".join(args[1:args.index("value")]).lower()
+        value = " ".join(args[args.index("value") + 1:])
+        if name == "hash":
+            self.stop()
+            size_mb = int(value)
+            self.ai.tt = ChessAI.TranspositionTable(size_mb) if size_mb else None
+        elif name == "ownbook":
+            self.ai.book = self.opening_book if value.lower() == "true" else None
+        elif name == "difficulty":
+            self.difficulty = min(2, max(1, int(value)))
+        elif name == "searchstats":
+            # every search then reports its SearchStats summary as an "info string stats {json}" line
+            self.ai.stats = ChessAI.SearchStats() if value.lower() == "true" else None
+
+    # position startpos|fen <fen> [moves <move> ...]
+    # the new position is only taken once every move of it was played
+    def set_position(self, args):
+        gs = ChessEngine.GameState()
+        moves = args.index("moves") if "moves" in args else len(args)
+        if args and args[0] == "fen":
+            gs.load_fen(" ".join(args[1:moves]))
+        for text in args[moves + 1:]:
+            gs.make_move(parse_move(gs, text))
+        self.gs = gs
+
+    # starts a search of the current position in a background thread, which answers with bestmove when it ends
+    def go(self, args):
+        limits = {}
+        for i, token in enumerate(args):
+            if token in ("depth", "movetime", "nodes", "wtime", "btime", "winc", "binc", "movestogo") and i + 1 < len(args):
+                limits[token] = int(args[i + 1])
+        depth = limits.get("depth", MAX_DEPTH)
+        time_limit = None
+        if "movetime" in limits:
+            time_limit = limits["movetime"] / 1000
+        elif "infinite" not in args:
+            remaining = limits.get("wtime" if self.gs.white_to_move else "btime")
+            if remaining is not None:
+                increment = limits.get("winc" if self.gs.white_to_move else "binc", 0)
+                moves_to_go = limits.get("movestogo", 0)
+                if moves_to_go <= 0: # "movestogo 0" (or a negative count) would divide by zero, spread it as usual
+                    moves_to_go = DEFAULT_MOVES_TO_GO
+                budget = remaining / moves_to_go + increment / 2
+                time_limit = min(budget, remaining / 2) / 1000
+        position = self.gs.copy()
+        self.thread = threading.Thread(target=self.search, args=(position, depth, time_limit, limits.get("nodes")),
+                                       daemon=True)
+        self.thread.start()
+
+    # runs in the search thread; whatever happens it answers with bestmove (the best move of the deepest finished
+    # iteration if the search failed, 0000 if there's none), so the GUI is never left waiting
+    def search(self, gs, depth, time_limit, node_limit):
+        move = None
+        self.ai.best_move = None # left from the previous search otherwise, when this one fails before starting
+        try:
+            move = self.report_search(gs, depth, time_limit, node_limit)
+        except Exception as error:
+            self.send(f"info string error: {type(error).__name__}: {error}")
+            move = self.ai.best_move
+        self.send(f"bestmove {move_to_uci(move) if move is not None else '0000'}")
+
+    # searches gs and sends its info lines; returns the move found (None if there's no legal move)
+    def report_search(self, gs, depth, time_limit, node_limit):
+        start = time.perf_counter()
+        # generate_smart_move's depth counts the plies below the root move
+        move = self.ai.generate_smart_move(gs, max(0, depth - 1), self.difficulty, time_limit, node_limit)
+        if move is None:
+            return None
+        if self.ai.best_score is not None:
+            milliseconds = max(1, int((time.perf_counter() - start) * 1000))
+            # the root position isn't stored in the transposition table, the line is read from after the best move
+            line = gs.copy()
+            line.make_move(move)
+            pv = [move] + self.ai.get_pv(line)
+            self.send(f"info depth {self.ai.completed_depth + 1} score {format_score(self.ai.best_score, gs.white_to_move)} "
+                      f"nodes {self.ai.nodes} time {milliseconds} nps {self.ai.nodes * 1000 // milliseconds} "
+                      f"pv {' '.join(move_to_uci(pv_move) for pv_move in pv)}")
+        if self.ai.stats is not None:
+            self.send(f"info string stats {self.ai.stats.to_json()}")
+        return move
+
+    # ends the running search; it still answers with the best move found so far
+    def stop(self):
+        if self.thread is None:
+            return
+        while self.thread.is_alive():
+            self.ai.stop()
+            self.thread.join(0.01)
+        self.thread = None
+
+    def close(self):
+        self.stop()
+        if self.opening_book is not None:
+            self.opening_book.close()
+        self.tablebases.close()
+
+
+def main():
+    engine = UCIEngine()
+    try:
+        for line in sys.stdin:
+            try:
+                if not engine.handle(line):
+                    break
+            except Exception as error:
+                # a bug shouldn't take the engine down in the middle of a tournament either
+                engine.send(f"info string error: {type(error).__name__}: {error}")
+    finally:
+        engine.close()
+
+
+if __name__ == "__main__":
+    main()